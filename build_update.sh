@@ -7,6 +7,7 @@
 # This creates:
 #   version.txt           – contains the version string
 #   otpi_update.tar.gz    – contains all .py files to deploy
+#   otpi_update.tar.gz.sha256 – checksum devices verify the bundle against
 #
 # Then uploads both as a GitHub Release (requires 'gh' CLI).
 # Install gh: sudo apt install gh   (then: gh auth login)
@@ -50,6 +51,10 @@ done
 tar czf otpi_update.tar.gz "${EXISTING[@]}"
 echo "  otpi_update.tar.gz -> ${#EXISTING[@]} files"
 
+# Checksum the device verifies the downloaded bundle against
+sha256sum otpi_update.tar.gz > otpi_update.tar.gz.sha256
+echo "  otpi_update.tar.gz.sha256 -> $(cut -d' ' -f1 otpi_update.tar.gz.sha256)"
+
 # Show bundle contents
 echo ""
 echo "Bundle contents:"
@@ -76,6 +81,7 @@ if command -v gh &>/dev/null; then
     gh release create "v${VERSION}" \
         version.txt \
         otpi_update.tar.gz \
+        otpi_update.tar.gz.sha256 \
         --title "v${VERSION}" \
         --notes "OTPi firmware update v${VERSION}"
 
@@ -90,5 +96,5 @@ else
     echo "Or manually create a release at:"
     echo "  https://github.com/mylesdedwards/OTPi/releases/new"
     echo "  Tag: v${VERSION}"
-    echo "  Attach: version.txt and otpi_update.tar.gz"
+    echo "  Attach: version.txt, otpi_update.tar.gz and otpi_update.tar.gz.sha256"
 fi
@@ -3,6 +3,18 @@
 
 import sys
 
+def _probe(bus: int, addr: int) -> bool:
+    """Cheap presence check: one SMBus read instead of a full luma init"""
+    try:
+        from smbus2 import SMBus
+        with SMBus(bus) as b:
+            b.read_byte(addr)
+        return True
+    except ImportError:
+        return True  # can't probe; let luma find out
+    except Exception:
+        return False
+
 def clear_oled():
     """Force clear the OLED display"""
     print("Attempting to clear OLED...")
@@ -12,33 +24,32 @@ def clear_oled():
         from luma.oled.device import ssd1306, sh1106
         from luma.core.render import canvas
         
-        # Try both common addresses and device types
-        configs = [
-            (1, 0x3C, ssd1306),
-            (1, 0x3D, ssd1306),
-            (1, 0x3C, sh1106),
-            (1, 0x3D, sh1106),
-        ]
-        
-        for bus, addr, device_class in configs:
-            try:
-                print(f"Trying {device_class.__name__} at 0x{addr:02X}...")
-                serial = i2c(port=bus, address=addr)
-                oled = device_class(serial)
-                
-                # Clear display
-                with canvas(oled) as draw:
-                    pass  # Empty canvas = clear screen
-                    
-                print("✓ OLED cleared successfully!")
-                return True
-                
-            except Exception as e:
-                if "timeout" in str(e).lower():
-                    print(f"✗ Timeout at 0x{addr:02X} - device busy")
-                else:
-                    print(f"- No device at 0x{addr:02X}")
+        # Only build luma devices on addresses that actually ACK
+        bus = 1
+        for addr in (0x3C, 0x3D):
+            if not _probe(bus, addr):
+                print(f"- No device at 0x{addr:02X}")
                 continue
+            
+            for device_class in (ssd1306, sh1106):
+                try:
+                    print(f"Trying {device_class.__name__} at 0x{addr:02X}...")
+                    serial = i2c(port=bus, address=addr)
+                    oled = device_class(serial)
+                    
+                    # Clear display
+                    with canvas(oled) as draw:
+                        pass  # Empty canvas = clear screen
+                        
+                    print("✓ OLED cleared successfully!")
+                    return True
+                    
+                except Exception as e:
+                    if "timeout" in str(e).lower():
+                        print(f"✗ Timeout at 0x{addr:02X} - device busy")
+                    else:
+                        print(f"- {device_class.__name__} failed at 0x{addr:02X}: {e}")
+                    continue
                 
         print("✗ Could not access OLED")
         return False
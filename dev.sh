@@ -4,7 +4,7 @@
 # Set development environment variables
 export PYTHONUNBUFFERED=1
 export OTPI_DEBUG_ENCODER_EVENTS=1  # Show encoder debug info
-export OTPI_ENC_POLL_MS=1           # Fast encoder polling
+export OTPI_ENC_POLL_MS=1           # Idle encoder polling (fast rate: OTPI_ENC_POLL_FAST_MS)
 export OTPI_ENC_BTN_DEBOUNCE_MS=10  # Button debounce
 
 # Optional: Set specific hardware backends for testing
@@ -82,7 +82,7 @@ echo "Press Ctrl+C to stop"
 echo ""
 
 # Run with preserved environment
-sudo --preserve-env=PYTHONUNBUFFERED,OTPI_ENC_CLK,OTPI_ENC_DT,OTPI_ENC_SW,OTPI_ENC_BTN_ACTIVE_LOW,OTPI_ENC_PPR,OTPI_ENC_POLL_MS,OTPI_GPIO_BACKEND,OTPI_LED_BACKEND,OTPI_DEBUG_ENCODER_EVENTS,PATH \
+sudo --preserve-env=PYTHONUNBUFFERED,OTPI_ENC_CLK,OTPI_ENC_DT,OTPI_ENC_SW,OTPI_ENC_BTN_ACTIVE_LOW,OTPI_ENC_PPR,OTPI_ENC_POLL_MS,OTPI_ENC_POLL_FAST_MS,OTPI_GPIO_BACKEND,OTPI_LED_BACKEND,OTPI_DEBUG_ENCODER_EVENTS,PATH \
   ./.venv/bin/python -u main.py
 
 echo -e "\n${YELLOW}Application stopped${NC}"
@@ -1,9 +1,9 @@
 #!/usr/bin/env python3
 # encoder.py – FIXED VERSION with enhanced resource management and GPIO cleanup
-# rotary encoder with threaded high-rate sampling
+# rotary encoder with edge-triggered alerts (lgpio) or threaded high-rate sampling
 # Backends: lgpio → periphery (cdev) → periphery (sysfs) → dummy
 
-import os, time, threading
+import os, time, threading, select, struct, importlib
 from typing import Optional
 
 def _envint(name: str, default: int) -> int:
@@ -15,8 +15,49 @@ DT_PIN  = _envint("OTPI_ENC_DT", 24)
 SW_PIN  = _envint("OTPI_ENC_SW", 25)
 BTN_ACTIVE_LOW = os.environ.get("OTPI_ENC_BTN_ACTIVE_LOW", "1").lower() not in ("0","false","no","off")
 PPR = max(1, _envint("OTPI_ENC_PPR", 4))  # transitions per detent (2 or 4)
-POLL_S = max(0.0003, float(os.environ.get("OTPI_ENC_POLL_MS", "1"))/1000.0)  # seconds
+PPR_SHIFT = PPR.bit_length() - 1 if (PPR & (PPR - 1)) == 0 else -1  # -1: not a power of two
+# polled backends sample slowly at rest and fast for FAST_HOLD_S after any movement
+POLL_S = max(0.0003, float(os.environ.get("OTPI_ENC_POLL_MS", "5"))/1000.0)  # idle interval, seconds
+POLL_FAST_S = min(POLL_S, max(0.0001, float(os.environ.get("OTPI_ENC_POLL_FAST_MS", "0.2"))/1000.0))
+FAST_HOLD_S = 0.1
+POLL_NS, POLL_FAST_NS, FAST_HOLD_NS = int(POLL_S * 1e9), int(POLL_FAST_S * 1e9), int(FAST_HOLD_S * 1e9)
 BTN_DEBOUNCE_S = max(0.001, float(os.environ.get("OTPI_ENC_BTN_DEBOUNCE_MS", "5"))/1000.0)
+BTN_DEBOUNCE_NS = int(BTN_DEBOUNCE_S * 1e9)
+# chatty claim/release/init prints only when encoder debugging is on (console writes are slow)
+_DEBUG = os.environ.get("OTPI_DEBUG_ENCODER_EVENTS", "0").lower() not in ("0","false","no","off")
+
+# ---------- Quadrature decoder ----------
+def _decode_tick(state: int, s: int, accum: int, ppr: int, shift: int):
+    """One quadrature step, pure integer math: (state, new 2-bit level, transition
+    accumulator) -> (new state, new accumulator, whole detents).
+    (a ^ old_b) - (old_a ^ b) is +1/-1 for a valid step, 0 otherwise.
+    Detents truncate toward zero; power-of-two PPR uses a shift instead of a divide."""
+    old_a, old_b = state >> 1, state & 1
+    a, b = s >> 1, s & 1
+    accum += (a ^ old_b) - (old_a ^ b)
+    if shift >= 0:
+        det = (accum >> shift) if accum >= 0 else -((-accum) >> shift)
+        return s, accum - (det << shift), det
+    det = (accum // ppr) if accum >= 0 else -((-accum) // ppr)
+    return s, accum - det * ppr, det
+
+# Optional native compile; opt-in because importing numba costs seconds on a Pi
+if os.environ.get("OTPI_ENC_NUMBA", "0").lower() not in ("0","false","no","off"):
+    try:
+        from numba import njit
+        _decode_tick = njit(cache=True)(_decode_tick)
+    except Exception:
+        pass
+
+# ---------- Backend modules: imported on first use, cached (None if missing) ----------
+_MODS = {}
+def _mod(name: str):
+    if name not in _MODS:
+        try: _MODS[name] = importlib.import_module(name)
+        except ImportError: _MODS[name] = None
+    return _MODS[name]
+
+_BACKEND_MOD = {"lgpio": "lgpio", "periph_cdev": "periphery", "periph_sysfs": "periphery"}
 
 # ---------- FIXED: Enhanced Backends with proper resource management ----------
 class _PinBase:
@@ -25,13 +66,16 @@ class _PinBase:
 
 class _LgpioPin(_PinBase):
     _chip = None
-    _claimed_pins = set()  # FIXED: Track claimed pins to avoid conflicts
+    _claimed_pins = {}  # line -> gpiochip handle it was claimed on
     _lock = threading.Lock()  # Thread safety for shared resources
     
     def __init__(self, line: int):
-        import lgpio
-        self._lg = lgpio
+        self._lg = _mod("lgpio")
+        if self._lg is None:
+            raise RuntimeError("lgpio not available")
         self._line = int(line)
+        self._cb = None
+        self.alert = False
         
         with _LgpioPin._lock:
             # Check if pin already claimed
@@ -46,10 +90,17 @@ class _LgpioPin(_PinBase):
                     raise RuntimeError(f"Failed to open GPIO chip: {e}")
             
             try:
-                # FIXED: Configure input with pullup resistor (critical for encoder stability)
-                self._lg.gpio_claim_input(_LgpioPin._chip, self._line, self._lg.SET_PULL_UP)
-                _LgpioPin._claimed_pins.add(self._line)
-                print(f"[DEBUG] Claimed GPIO {self._line} with pullup")
+                # Claim as an alert line (both edges) with pullup resistor so the
+                # kernel reports transitions instead of us polling for them
+                try:
+                    self._lg.gpio_claim_alert(_LgpioPin._chip, self._line, self._lg.BOTH_EDGES,
+                                              self._lg.SET_PULL_UP)
+                    self.alert = True
+                except Exception:
+                    # no alert support: plain input, Encoder regroups the lines for polling
+                    self._lg.gpio_claim_input(_LgpioPin._chip, self._line, self._lg.SET_PULL_UP)
+                _LgpioPin._claimed_pins[self._line] = _LgpioPin._chip
+                if _DEBUG: print(f"[DEBUG] Claimed GPIO {self._line} ({'alert' if self.alert else 'input'}) with pullup")
             except Exception as e:
                 raise RuntimeError(f"Failed to claim GPIO {self._line}: {e}")
     
@@ -59,47 +110,94 @@ class _LgpioPin(_PinBase):
         except Exception:
             return 1  # Fail safe to high (with pullups, this is the default state)
     
+    def watch(self, func, debounce_s: float = 0.0):
+        """Register func(chip, gpio, level, tick) to run on every edge of this line"""
+        if debounce_s > 0:
+            self._lg.gpio_set_debounce_micros(_LgpioPin._chip, self._line, int(debounce_s * 1e6))
+        self._cb = self._lg.callback(_LgpioPin._chip, self._line, self._lg.BOTH_EDGES, func)
+
     def close(self):
+        if self._cb is not None:
+            try: self._cb.cancel()
+            except Exception: pass
+            self._cb = None
         with _LgpioPin._lock:
-            if hasattr(self, '_line') and self._line in _LgpioPin._claimed_pins:
+            handle = _LgpioPin._claimed_pins.pop(getattr(self, '_line', None), None)
+            if handle is not None:
                 try:
-                    self._lg.gpio_free(_LgpioPin._chip, self._line)
-                    _LgpioPin._claimed_pins.remove(self._line)
-                    print(f"[DEBUG] Released GPIO {self._line}")
+                    self._lg.gpio_free(handle, self._line)
+                    if _DEBUG: print(f"[DEBUG] Released GPIO {self._line}")
                 except Exception as e:
                     print(f"[DEBUG] Failed to release GPIO {self._line}: {e}")
     
     @classmethod
     def cleanup_all(cls):
         """FIXED: Clean up all claimed pins"""
+        lg = _mod("lgpio")
         with cls._lock:
             if cls._chip is not None:
-                for pin in list(cls._claimed_pins):
+                while cls._claimed_pins:
+                    pin, handle = cls._claimed_pins.popitem()
                     try:
-                        cls._lg.gpio_free(cls._chip, pin)
-                        print(f"[DEBUG] Force-released GPIO {pin}")
+                        lg.gpio_free(handle, pin)
+                        if _DEBUG: print(f"[DEBUG] Force-released GPIO {pin}")
                     except Exception:
                         pass
-                cls._claimed_pins.clear()
                 try:
-                    cls._lg.gpiochip_close(cls._chip)
-                    print("[DEBUG] Closed GPIO chip")
+                    lg.gpiochip_close(cls._chip)
+                    if _DEBUG: print("[DEBUG] Closed GPIO chip")
                 except Exception:
                     pass
                 cls._chip = None
 
+class _LgpioGroup:
+    """CLK/DT[/SW] claimed as one lgpio group: one group_read() ioctl per sample
+    instead of one gpio_read() per line, and all levels come from the same instant"""
+    def __init__(self, lines):
+        self._lg = _mod("lgpio")
+        self._lines = [int(l) for l in lines]
+        with _LgpioPin._lock:
+            if _LgpioPin._chip is None:
+                _LgpioPin._chip = self._lg.gpiochip_open(0)
+            self._lg.group_claim_input(_LgpioPin._chip, self._lines, self._lg.SET_PULL_UP)
+        self._idle = 1 if BTN_ACTIVE_LOW else 0
+
+    def read_all(self):
+        """(clk, dt, sw) levels; bit n of the group bitmap is the n-th claimed line"""
+        _size, bits = self._lg.group_read(_LgpioPin._chip, self._lines[0])
+        return bits & 1, (bits >> 1) & 1, ((bits >> 2) & 1) if len(self._lines) > 2 else self._idle
+
+    def close(self):
+        with _LgpioPin._lock:
+            if _LgpioPin._chip is not None:
+                try: self._lg.group_free(_LgpioPin._chip, self._lines[0])
+                except Exception: pass
+
+_EVHEAD = struct.Struct("<QI")
+
 class _PeriphCdevPin(_PinBase):
     def __init__(self, line: int, chip: str="/dev/gpiochip0"):
-        from periphery import GPIO as _GPIO
-        self._g = _GPIO(chip, int(line), "in")
+        _GPIO = _mod("periphery").GPIO
+        # request both-edge events; the kernel queues them on the line fd for Encoder to drain
+        self._g = _GPIO(chip, int(line), "in", edge="both")
+        self.fd = self._g.fd
+        # raw event record: v2 gpio_v2_line_event is 48 bytes, v1 gpioevent_data 16;
+        # both start with u64 timestamp, u32 id (1 = rising, 2 = falling)
+        self._evsize = 48 if type(self._g).__name__ == "Cdev2GPIO" else 16
     def read(self) -> int: return 1 if self._g.read() else 0
+    def events(self):
+        """Drain queued edge events as (timestamp_ns, level) pairs.
+        Reads the fd directly (one read() for the whole queue); only call when readable."""
+        buf = os.read(self.fd, self._evsize * 64)
+        return [(ts, 1 if eid == 1 else 0)
+                for ts, eid in (_EVHEAD.unpack_from(buf, off) for off in range(0, len(buf), self._evsize))]
     def close(self): 
         try: self._g.close()
         except Exception: pass
 
 class _PeriphSysfsPin(_PinBase):
     def __init__(self, line: int):
-        from periphery import GPIO as _GPIO
+        _GPIO = _mod("periphery").GPIO
         self._g = _GPIO(int(line), "in")
     def read(self) -> int: return 1 if self._g.read() else 0
     def close(self):
@@ -108,7 +206,16 @@ class _PeriphSysfsPin(_PinBase):
 
 class _DummyPin(_PinBase): pass
 
+_BACKENDS = {"lgpio": _LgpioPin, "periph_cdev": _PeriphCdevPin, "periph_sysfs": _PeriphSysfsPin}
+_BACKEND = None  # first backend that produced a pin; later pins skip the probe cascade
+
 def _make_pin(line: int) -> _PinBase:
+    global _BACKEND
+    if _BACKEND is not None:
+        try:
+            return _BACKEND(line)
+        except Exception:
+            pass  # e.g. this line is busy: fall back to a full probe
     force = os.environ.get("OTPI_GPIO_BACKEND", "").lower().strip()
     order = (["lgpio"] if force=="lgpio" else
              ["periph_cdev"] if force in ("periphery_cdev","periphery-cdev","cdev") else
@@ -116,10 +223,13 @@ def _make_pin(line: int) -> _PinBase:
              ["lgpio","periph_cdev","periph_sysfs"])
     last = None
     for b in order:
+        if _mod(_BACKEND_MOD[b]) is None:
+            last = ImportError(f"{_BACKEND_MOD[b]} not installed")
+            continue
         try:
-            if b=="lgpio": return _LgpioPin(line)
-            if b=="periph_cdev": return _PeriphCdevPin(line)
-            if b=="periph_sysfs": return _PeriphSysfsPin(line)
+            pin = _BACKENDS[b](line)
+            _BACKEND = _BACKENDS[b]
+            return pin
         except Exception as e:
             last = e
     if last: print(f"[DEBUG] Encoder backends failed ({last}); using dummy")
@@ -129,7 +239,9 @@ def _make_pin(line: int) -> _PinBase:
 class Encoder:
     """
     FIXED VERSION: Enhanced resource management and GPIO cleanup
-    High-rate sampled quadrature with button latch.
+    Edge-triggered quadrature with button latch: lgpio alerts arrive via callbacks,
+    periphery cdev edge events are drained inline by steps()/pressed(), and only
+    the sysfs backend falls back to a high-rate sampling thread.
     steps() returns signed detents since last call.
     pressed() returns True once per physical press (debounced) since last call.
     """
@@ -138,6 +250,10 @@ class Encoder:
         self._clk = self._dt = self._sw = None
         self._stop = False
         self._t = None
+        self._alerts = False
+        self._ep = None
+        self._group = None
+        self._activity = threading.Event()  # set by producers on a detent or press
         
         try:
             # FIXED: Clean up any existing pins first to avoid conflicts
@@ -152,7 +268,7 @@ class Encoder:
             b = self._dt.read()
             sw = self._sw.read() if self._sw else (1 if BTN_ACTIVE_LOW else 0)
             
-            print(f"[DEBUG] Encoder initial levels: CLK={a}, DT={b}, SW={sw}")
+            if _DEBUG: print(f"[DEBUG] Encoder initial levels: CLK={a}, DT={b}, SW={sw}")
             
             # Sanity check - with pullups, we should see mostly 1s at rest
             if a == b == sw == 0:
@@ -160,52 +276,143 @@ class Encoder:
             
             # Initialize state
             self._state = (a << 1) | b
+            self._last_levels = (a << 2) | (b << 1) | sw  # packed (clk, dt, sw) snapshot
             self._accum = 0       # transitions accumulator
-            self._steps = 0       # detents accumulator (thread-safe via lock)
+            # detents: producer only adds to _steps_total, consumer only advances
+            # _steps_read, so neither side needs a lock and no detent can be lost
+            self._steps_total = 0
+            self._steps_read = 0
             self._press_latch = False
             self._btn_last = sw
-            self._btn_last_change = time.perf_counter()
-            self._lock = threading.Lock()
+            self._btn_last_change = time.monotonic_ns()
+            self._btn_hold_active = False  # polled button: latched, waiting for release
+            self._btn_edge_ts = -BTN_DEBOUNCE_NS
             
-            # Transition table for quadrature decoding
-            self._tbl = [0,-1,+1,0,  +1,0,0,-1,  -1,0,0,+1,  0,+1,-1,0]
-            
-            # Start background thread
-            self._t = threading.Thread(target=self._poll_loop, daemon=True)
-            self._t.start()
+            # lgpio delivers edges via callbacks; cdev queues them in the kernel for
+            # steps()/pressed() to drain; sysfs (and lgpio without alerts) need the sampler
+            pins = (self._clk, self._dt) + ((self._sw,) if self._sw else ())
+            self._clk_line, self._dt_line = int(clk_pin), int(dt_pin)
+            if all(isinstance(p, _LgpioPin) and p.alert for p in pins):
+                self._clk.watch(self._on_edge)
+                self._dt.watch(self._on_edge)
+                if self._sw:
+                    self._sw.watch(self._on_edge, BTN_DEBOUNCE_S)
+                self._alerts = True
+            elif all(isinstance(p, _PeriphCdevPin) for p in pins):
+                self._ep = select.epoll()
+                self._by_fd = {}
+                for p, line in zip(pins, (clk_pin, dt_pin, btn_pin)):
+                    self._ep.register(p.fd, select.EPOLLIN | select.EPOLLPRI)
+                    self._by_fd[p.fd] = (p, int(line))
+            else:
+                if all(isinstance(p, _LgpioPin) for p in pins):
+                    # re-claim the lines as one group so each sample is a single read
+                    for p in pins: p.close()
+                    lines = (clk_pin, dt_pin) + ((btn_pin,) if self._sw else ())
+                    self._group = _LgpioGroup(lines)
+                self._t = threading.Thread(target=self._poll_loop, daemon=True)
+                self._t.start()
             
             self._ok = True
-            print(f"[DEBUG] Encoder initialized successfully")
+            if _DEBUG: print(f"[DEBUG] Encoder initialized successfully")
             
         except Exception as e:
             print(f"[DEBUG] Encoder init failed ({e}); continuing without encoder")
             self._cleanup()
             self._ok = False
 
-    # Background sampler with enhanced error handling
+    # Edge callback (lgpio alert thread); level 2 is a watchdog timeout, not an edge
+    def _on_edge(self, chip, gpio, level, tick):
+        if level > 1:
+            return
+        if gpio == self._clk_line or gpio == self._dt_line:
+            self._quad_edge(gpio, level)
+        else:
+            # button line is debounced in the kernel; latch on the active edge
+            self._btn_last = level
+            if (level==0) if BTN_ACTIVE_LOW else (level==1):
+                self._press_latch = True
+                self._activity.set()
+        self._last_levels = (self._state << 1) | self._btn_last
+
+    def _quad_edge(self, gpio: int, level: int):
+        """Apply one CLK/DT edge to the quadrature state (single producer thread)"""
+        st = self._state
+        s = ((level << 1) | (st & 1)) if gpio == self._clk_line else ((st & 2) | level)
+        self._state, self._accum, det = _decode_tick(st, s, self._accum, PPR, PPR_SHIFT)
+        if det:
+            self._steps_total += det
+            self._activity.set()
+
+    # Inline drain of queued cdev edge events (caller's thread, no sampler thread)
+    def _pump(self):
+        evs = []
+        for fd, _ev in self._ep.poll(0):
+            pin, line = self._by_fd[fd]
+            evs.extend((ts, line, lvl) for ts, lvl in pin.events())
+        if not evs:
+            return
+        evs.sort()  # merge CLK/DT/SW queues by kernel timestamp
+        for ts, line, lvl in evs:
+            if line == self._clk_line or line == self._dt_line:
+                self._quad_edge(line, lvl)
+                continue
+            # button: accept an active edge only if the line was quiet for the debounce time
+            self._btn_last = lvl
+            if ((lvl==0) if BTN_ACTIVE_LOW else (lvl==1)) and ts - self._btn_edge_ts >= BTN_DEBOUNCE_NS:
+                self._press_latch = True
+            self._btn_edge_ts = ts
+        self._last_levels = (self._state << 1) | self._btn_last
+
+    def _read_all_fn(self):
+        """Callable returning one (clk, dt, sw) snapshot: a single group read when
+        lgpio lines are grouped, otherwise one read per pin"""
+        if self._group:
+            return self._group.read_all
+        clk_read, dt_read = self._clk.read, self._dt.read
+        sw_read = self._sw.read if self._sw else None
+        idle = 1 if BTN_ACTIVE_LOW else 0
+        def read_all():
+            return clk_read(), dt_read(), (sw_read() if sw_read else idle)
+        return read_all
+
+    # Background sampler with enhanced error handling (sysfs / lgpio-without-alerts)
     def _poll_loop(self):
-        next_t = time.perf_counter()
+        # integer-ns deadline schedule; the deadline itself is the loop's clock, so
+        # debounce/fast-window checks need no extra timestamp reads
+        next_ns = time.monotonic_ns()
         consecutive_errors = 0
         max_errors = 10  # Stop after too many consecutive errors
+
+        # pins never change during a run: bind hot-path lookups to locals once
+        read_all = self._read_all_fn()
+        has_sw = self._sw is not None
+        active_lvl = 0 if BTN_ACTIVE_LOW else 1
+        decode = _decode_tick
+        ppr, ppr_shift, poll_ns, poll_fast_ns = PPR, PPR_SHIFT, POLL_NS, POLL_FAST_NS
+        monotonic_ns, _sleep = time.monotonic_ns, time.sleep
+        fast_until = 0
+
+        # real-time priority keeps fast sampling deterministic (needs CAP_SYS_NICE)
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(1))
+        except Exception:
+            pass
         
         while not self._stop:
+            lvl = None
             try:
-                # quadrature reading
-                a = self._clk.read()
-                b = self._dt.read()
+                # quadrature reading (all lines sampled together)
+                a, b, lvl = read_all()
                 s = (a<<1)|b
-                idx = ((self._state<<2)|s) & 0xF
-                self._state = s
-                delta = self._tbl[idx]
+                self._last_levels = (s << 1) | lvl
                 
-                if delta:
-                    self._accum += delta
-                    # convert transitions -> detents
-                    det = int(self._accum / PPR)
+                if s != self._state:
+                    fast_until = next_ns + FAST_HOLD_NS
+                    self._state, self._accum, det = decode(self._state, s, self._accum, ppr, ppr_shift)
                     if det:
-                        with self._lock:
-                            self._steps += det
-                        self._accum -= det * PPR
+                        self._steps_total += det
+                        self._activity.set()
                 
                 # Reset error counter on successful read
                 consecutive_errors = 0
@@ -216,50 +423,56 @@ class Encoder:
                     print(f"[DEBUG] Encoder thread stopping due to {consecutive_errors} consecutive errors")
                     break
 
-            # button latch (debounced) with error handling
-            if self._sw:
-                try:
-                    lvl = self._sw.read()
-                    now = time.perf_counter()
-                    if lvl != self._btn_last:
-                        self._btn_last = lvl
-                        self._btn_last_change = now
-                    else:
-                        active = (lvl==0) if BTN_ACTIVE_LOW else (lvl==1)
-                        if active and (now - self._btn_last_change) >= BTN_DEBOUNCE_S:
-                            # latch once per press; clear on release
-                            self._press_latch = True
-                            # wait for release before latching again
-                            while not self._stop:
-                                lvl2 = self._sw.read()
-                                if ((lvl2==1) if BTN_ACTIVE_LOW else (lvl2==0)):
-                                    self._btn_last = lvl2
-                                    self._btn_last_change = time.perf_counter()
-                                    break
-                                time.sleep(max(POLL_S, 0.001))
-                except Exception:
-                    consecutive_errors += 1
-                    if consecutive_errors > max_errors:
-                        break
-
-            # sleep to target poll interval
-            next_t += POLL_S
-            delay = next_t - time.perf_counter()
-            if delay > 0:
-                time.sleep(delay)
+            # button FSM (debounced): latch once when the level has been active for the
+            # debounce time, then hold until the line returns to its inactive level;
+            # quadrature keeps being decoded every tick while the button is held
+            if has_sw and lvl is not None:
+                if lvl != self._btn_last:
+                    self._btn_last = lvl
+                    self._btn_last_change = next_ns
+                if lvl != active_lvl:
+                    self._btn_hold_active = False
+                elif not self._btn_hold_active and (next_ns - self._btn_last_change) >= BTN_DEBOUNCE_NS:
+                    self._press_latch = True
+                    self._btn_hold_active = True
+                    self._activity.set()
+
+            # sleep to target poll interval: fast while the knob is turning, slow at rest
+            next_ns += poll_fast_ns if next_ns < fast_until else poll_ns
+            now = monotonic_ns()
+            if next_ns > now:
+                _sleep((next_ns - now) / 1e9)
             else:
-                next_t = time.perf_counter()  # missed; resync
+                next_ns = now  # missed; resync
 
     # API
     def steps(self) -> int:
         if not self._ok: return 0
-        with self._lock:
-            s = self._steps
-            self._steps = 0
+        if self._ep: self._pump()
+        total = self._steps_total
+        s = total - self._steps_read
+        self._steps_read = total
         return s
 
+    def wait_activity(self, timeout: float) -> bool:
+        """Block up to `timeout` seconds for encoder input; True if woken by it.
+        Lets a frame loop sleep until its next deadline without adding input latency."""
+        if timeout <= 0:
+            return False
+        if not self._ok:
+            time.sleep(timeout)
+            return False
+        if self._ep:
+            # cdev: wait on the kernel edge queues themselves; steps()/pressed() drain them
+            return bool(self._ep.poll(timeout))
+        if self._activity.wait(timeout):
+            self._activity.clear()
+            return True
+        return False
+
     def pressed(self) -> bool:
         if not self._ok or self._sw is None: return False
+        if self._ep: self._pump()
         if self._press_latch:
             self._press_latch = False
             return True
@@ -274,9 +487,13 @@ class Encoder:
             self._t.join(timeout=1.0)
             if self._t.is_alive():
                 print("[DEBUG] Warning: Encoder thread did not stop cleanly")
+
+        if self._ep:
+            self._ep.close()
+            self._ep = None
         
         # Clean up GPIO pins
-        for pin in (self._clk, self._dt, self._sw):
+        for pin in (self._group, self._clk, self._dt, self._sw):
             if pin:
                 try:
                     pin.close()
@@ -286,7 +503,7 @@ class Encoder:
         # Clean up lgpio resources
         _LgpioPin.cleanup_all()
         
-        print("[DEBUG] Encoder cleanup completed")
+        if _DEBUG: print("[DEBUG] Encoder cleanup completed")
 
     def close(self):
         self._cleanup()
@@ -294,6 +511,7 @@ class Encoder:
     # --- DEBUG HELPERS ---
     def backend_name(self) -> str:
         try:
+            if self._group:                           return "lgpio_group"
             if isinstance(self._clk, _LgpioPin):      return "lgpio"
             if isinstance(self._clk, _PeriphCdevPin): return "periph_cdev"
             if isinstance(self._clk, _PeriphSysfsPin):return "periph_sysfs"
@@ -303,11 +521,10 @@ class Encoder:
         return "unknown"
 
     def raw_levels(self):
-        """Get current pin levels for debugging"""
+        """Get current pin levels for debugging (last sampled/edge state, no GPIO reads)"""
         try:
-            a = self._clk.read() if self._clk else None
-            b = self._dt.read()  if self._dt  else None
-            s = self._sw.read()  if self._sw  else None
-            return a, b, s
+            if self._ep: self._pump()
+            x = self._last_levels
+            return (x >> 2) & 1, (x >> 1) & 1, (x & 1) if self._sw else None
         except Exception:
             return None
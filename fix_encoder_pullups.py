@@ -55,21 +55,52 @@ def test_with_pullups():
         
         # Test rotation detection
         print("\nTesting rotation (turn encoder now):")
-        last_clk = last_dt = None
+        levels = {clk_pin: lgpio.gpio_read(chip, clk_pin), dt_pin: lgpio.gpio_read(chip, dt_pin)}
         changes = 0
-        
-        start_time = time.time()
-        while time.time() - start_time < 5.0:  # 5 seconds
-            clk = lgpio.gpio_read(chip, clk_pin)
-            dt = lgpio.gpio_read(chip, dt_pin)
-            
-            if clk != last_clk or dt != last_dt:
-                changes += 1
-                print(f"    Change #{changes}: CLK={clk}, DT={dt}")
-                last_clk, last_dt = clk, dt
-                
-            time.sleep(0.01)
-        
+
+        def on_edge(_chip, gpio, level, _tick):
+            nonlocal changes
+            if level > 1:  # watchdog timeout, not an edge
+                return
+            levels[gpio] = level
+            changes += 1
+            print(f"    Change #{changes}: CLK={levels[clk_pin]}, DT={levels[dt_pin]}")
+
+        # Edge alerts from the kernel: every transition is delivered, no 10ms polling
+        callbacks = []
+        try:
+            for pin in (clk_pin, dt_pin):
+                lgpio.gpio_free(chip, pin)
+                lgpio.gpio_claim_alert(chip, pin, lgpio.BOTH_EDGES, lgpio.SET_PULL_UP)
+                callbacks.append(lgpio.callback(chip, pin, lgpio.BOTH_EDGES, on_edge))
+            time.sleep(5.0)  # 5 seconds
+        except Exception as e:
+            print(f"  Edge alerts unavailable ({e}), polling instead")
+            for cb in callbacks:
+                cb.cancel()
+            callbacks = []
+            for pin in (clk_pin, dt_pin):
+                try:
+                    lgpio.gpio_free(chip, pin)
+                except Exception:
+                    pass
+                lgpio.gpio_claim_input(chip, pin, lgpio.SET_PULL_UP)
+            last_clk = last_dt = None
+            start_time = time.time()
+            while time.time() - start_time < 5.0:  # 5 seconds
+                clk = lgpio.gpio_read(chip, clk_pin)
+                dt = lgpio.gpio_read(chip, dt_pin)
+
+                if clk != last_clk or dt != last_dt:
+                    changes += 1
+                    print(f"    Change #{changes}: CLK={clk}, DT={dt}")
+                    last_clk, last_dt = clk, dt
+
+                time.sleep(0.01)
+        finally:
+            for cb in callbacks:
+                cb.cancel()
+
         print(f"  Total pin changes detected: {changes}")
         
         # Clean up
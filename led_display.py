@@ -4,7 +4,10 @@
 
 import os
 import time
-import colorsys
+import traceback
+from time import time as _now, sleep as _sleep, monotonic as _monotonic
+from array import array
+from functools import lru_cache
 from typing import Tuple, List
 
 # ---------- Seven-segment mapping (your layout) ----------
@@ -36,7 +39,8 @@ SEGMENT_TO_LEDS = {
 NUM_DIGITS       = 6
 LEDS_PER_DIGIT   = 21
 TIMER_LED_COUNT  = 25
-TOTAL_PIXELS     = NUM_DIGITS * LEDS_PER_DIGIT + TIMER_LED_COUNT  # 151
+TIMER_START      = NUM_DIGITS * LEDS_PER_DIGIT                    # 126, first countdown LED
+TOTAL_PIXELS     = TIMER_START + TIMER_LED_COUNT                   # 151
 
 # ---------- Config / env ----------
 
@@ -48,6 +52,9 @@ MAX_LED_BRIGHT   = 0.80  # user 100% == 0.80 actual output
 
 DEFAULT_SETTINGS = {"brightness": DEFAULT_BRIGHT, "hue": 0.33}
 
+FRAME_S          = 0.05  # 20 FPS while the countdown bar or OLED is live
+FRAME_IDLE_S     = 1.0   # no LEDs and OLED asleep: only timers left to service
+
 # Encoder debug toggle (prints backend, raw levels, hue/bright changes)
 ENC_DBG          = os.environ.get("OTPI_DEBUG_ENCODER", "0").lower() not in ("0", "false", "no", "off")
 
@@ -57,6 +64,7 @@ from oled_ui import OledUI, ResetAction, perform_reset
 
 # ---------- Hardware abstraction (Blinka NeoPixel) ----------
 
+@lru_cache(maxsize=8)
 def _board_pin_from_bcm(bcm: int):
     import board
     # map common BCM pins to Blinka pins; default to D18
@@ -68,6 +76,12 @@ def _board_pin_from_bcm(bcm: int):
     }
     return m.get(bcm) or getattr(board, "D18")
 
+_DIGITS_OFF = bytes(TIMER_START * 3)  # all digit LEDs off, copied in by clear_digits()
+
+def _brightness_lut(b: float) -> bytes:
+    """256-entry byte table scaling a channel value by brightness b (as pixelbuf does)."""
+    return bytes(int(c * b) for c in range(256))
+
 class _Strip:
     def __init__(self, count: int, brightness: float, pin_bcm: int):
         import neopixel
@@ -85,34 +99,104 @@ class _Strip:
             if val is not None:
                 order_map[name] = val
 
-        order = order_map.get(PIXEL_ORDER_ENV, order_map.get("GRB", next(iter(order_map.values()))))
+        order_name = PIXEL_ORDER_ENV if PIXEL_ORDER_ENV in order_map else "GRB"
+        order = order_map.get(order_name, next(iter(order_map.values())))
         pin = _board_pin_from_bcm(pin_bcm)
 
         self.n = count
+        # Frame buffer in wire byte order (e.g. g, r, b per pixel); drawing writes here,
+        # show() pushes it out. wire byte k of a pixel is rgb[_wire_idx[k]].
+        self._wire_idx = tuple("RGB".index(c) for c in order_name)
+        self._rgb_pos = tuple(order_name.index(c) for c in "RGB")
+        self._buf = bytearray(count * 3)
+        self._prev = None  # last buffer actually sent; None forces the next show()
+        self._timer_key = None  # (full, color) the countdown bar body was last drawn with
+        self._digit_key = None  # (on, off) colors of the cached digit templates
+        self._digit_tmpl = ()
+        # Brightness is applied by us while copying out, so the driver stays at 1.0
+        self._bright = max(0.0, min(1.0, float(brightness)))
+        self._bright_lut = _brightness_lut(self._bright)
         self._np = neopixel.NeoPixel(
             pin, count, auto_write=False,
             pixel_order=order,
-            brightness=max(0.0, min(1.0, float(brightness)))
+            brightness=1.0
         )
+        # pixelbuf transmits _post_brightness_buffer as-is; copy straight into it when present
+        post = getattr(self._np, "_post_brightness_buffer", None)
+        if post is not None and getattr(self._np, "_bpp", 3) == 3:
+            off = getattr(self._np, "_offset", 0)
+            self._raw = memoryview(post)[off:off + count * 3]
+        else:
+            self._raw = None
         try:
             current_order = getattr(self._np, "pixel_order", PIXEL_ORDER_ENV)
         except Exception:
             current_order = PIXEL_ORDER_ENV
-        print(f"[LED] backend=neopixel pin={pin_bcm} count={count} order={current_order} bright={self._np.brightness:.2f}")
+        print(f"[LED] backend=neopixel pin={pin_bcm} count={count} order={current_order} bright={self._bright:.2f}")
 
     def set_brightness(self, b: float):
-        self._np.brightness = max(0.0, min(1.0, float(b)))
-
+        b = float(b)
+        b = b if 0.0 <= b <= 1.0 else (0.0 if b < 0.0 else 1.0)
+        if b != self._bright:
+            self._bright = b
+            self._bright_lut = _brightness_lut(b)
+            self._prev = None
+
+    def wire(self, rgb) -> Tuple[int, int, int]:
+        """(r, g, b) reordered into the strip's wire byte order."""
+        w0, w1, w2 = self._wire_idx
+        return (rgb[w0], rgb[w1], rgb[w2])
+
+    # Colors are 0..255 ints from the LUTs/constants; the bytearray rejects anything else
     def set(self, i: int, rgb):
         if 0 <= i < self.n:
-            r, g, b = (int(max(0, min(255, c))) for c in rgb)
-            self._np[i] = (r, g, b)
+            if i >= TIMER_START:
+                self._timer_key = None
+            o = i * 3
+            self._buf[o:o + 3] = bytes(self.wire(rgb))
+
+    def set_many(self, indices, rgb):
+        """Write one pre-clamped color to every index in `indices`."""
+        buf = self._buf
+        r, g, b = self.wire(rgb)
+        for i in indices:
+            o = i * 3
+            buf[o] = r; buf[o + 1] = g; buf[o + 2] = b
+
+    def fill_region(self, start: int, stop: int, rgb):
+        """Write one pre-clamped color to the contiguous range [start, stop)."""
+        if stop > start:
+            self._buf[start * 3:stop * 3] = bytes(self.wire(rgb)) * (stop - start)
 
     def fill(self, rgb):
-        r, g, b = (int(max(0, min(255, c))) for c in rgb)
-        self._np.fill((r, g, b))
+        self.fill_region(0, self.n, rgb)
+        self._timer_key = None
+
+    def digit_templates(self, on_rgb, off_rgb):
+        """Per-value wire-order bytes for one whole digit, rebuilt only when the colors change."""
+        key = (on_rgb, off_rgb)
+        if self._digit_key != key:
+            on, off = bytes(self.wire(on_rgb)), bytes(self.wire(off_rgb))
+            self._digit_tmpl = tuple(b"".join(on if lit else off for lit in m) for m in DIGIT_MASKS)
+            self._digit_key = key
+        return self._digit_tmpl
+
+    def clear_digits(self):
+        """Blank every digit LED with one memset-style slice copy."""
+        self._buf[:len(_DIGITS_OFF)] = _DIGITS_OFF
 
     def show(self):
+        buf = self._buf
+        # Unchanged frame: skip the ~4.5 ms WS2812 transmit entirely
+        if buf == self._prev:
+            return
+        self._prev = bytes(buf)
+        out = buf if self._bright >= 1.0 else buf.translate(self._bright_lut)
+        if self._raw is not None:
+            self._raw[:] = out  # one memcpy instead of a __setitem__ per pixel
+        else:
+            pr, pg, pb = self._rgb_pos
+            self._np[:] = [(out[o + pr], out[o + pg], out[o + pb]) for o in range(0, len(out), 3)]
         self._np.show()
 
     def deinit(self):
@@ -135,9 +219,6 @@ def _local_to_phys(digit_index: int, local_led_1based: int) -> int:
     """Convert per-digit local index (1..21) to global physical index (0-based)."""
     return _digit_base(digit_index) + (local_led_1based - 1)
 
-def _segments_for_digit_char(ch: str) -> List[str]:
-    return SEGMENT_MAP.get(ch, [])
-
 def _leds_for_segments(digit_index: int, segments: List[str]) -> List[int]:
     """Return list of 0-based physical indices to light for given segments on a digit."""
     phys: List[int] = []
@@ -146,39 +227,77 @@ def _leds_for_segments(digit_index: int, segments: List[str]) -> List[int]:
             phys.append(_local_to_phys(digit_index, local))
     return phys
 
-def _timer_range() -> range:
-    """0-based indices for the countdown strip (last 25 LEDs)."""
-    start = NUM_DIGITS * LEDS_PER_DIGIT  # 126
-    return range(start, start + TIMER_LED_COUNT)  # 126..150
+# Per-digit char -> physical indices, built once at import: DIGIT_CHAR_TO_PHYS[d][ch]
+DIGIT_CHAR_TO_PHYS = tuple(
+    {ch: tuple(_leds_for_segments(d, segs)) for ch, segs in SEGMENT_MAP.items()}
+    for d in range(NUM_DIGITS)
+)
+# Every digit has the same local layout, so one lit/unlit mask per value covers all six:
+# DIGIT_MASKS[v][j] is True when local LED j+1 is lit for value v
+DIGIT_MASKS = tuple(
+    tuple(any(j + 1 in SEGMENT_TO_LEDS[seg] for seg in SEGMENT_MAP[str(v)]) for j in range(LEDS_PER_DIGIT))
+    for v in range(10)
+)
+
+# Same table flattened for _build_frame: entry k = digit * 10 + value holds
+# DIGIT_PHYS_LEN[k] indices starting at DIGIT_PHYS_FLAT[k * LEDS_PER_DIGIT]
+DIGIT_PHYS_FLAT = array("H", bytes(2 * NUM_DIGITS * 10 * LEDS_PER_DIGIT))
+DIGIT_PHYS_LEN = bytearray(NUM_DIGITS * 10)
+for _d in range(NUM_DIGITS):
+    for _v in range(10):
+        _k = _d * 10 + _v
+        _idx = DIGIT_CHAR_TO_PHYS[_d].get(str(_v), ())
+        DIGIT_PHYS_LEN[_k] = len(_idx)
+        DIGIT_PHYS_FLAT[_k * LEDS_PER_DIGIT:_k * LEDS_PER_DIGIT + len(_idx)] = array("H", _idx)
+del _d, _v, _k, _idx
 
 # ---------- Color / draw helpers ----------
 
 def _hsv2rgb(h, s, v):
-    r, g, b = colorsys.hsv_to_rgb(h % 1.0, max(0, min(1, s)), max(0, min(1, v)))
+    # Same math as colorsys.hsv_to_rgb, with the sextant picked by table index
+    h = (h % 1.0) * 6.0
+    s = s if 0 <= s <= 1 else (0 if s < 0 else 1)
+    v = v if 0 <= v <= 1 else (0 if v < 0 else 1)
+    i = int(h)
+    f = h - i
+    p = v * (1.0 - s)
+    q = v * (1.0 - s * f)
+    t = v * (1.0 - s * (1.0 - f))
+    r, g, b = ((v, t, p), (q, v, p), (p, v, t), (p, q, v), (t, p, v), (v, p, q))[i % 6]
     return int(r * 255), int(g * 255), int(b * 255)
 
+# Full-saturation, full-value hue wheel at 0.1° steps: HUE_LUT[int(hue * HUE_STEPS) % HUE_STEPS]
+HUE_STEPS = 3600
+HUE_LUT = tuple(_hsv2rgb(i / HUE_STEPS, 1.0, 1.0) for i in range(HUE_STEPS))
+
 def _scale(c: Tuple[int, int, int], f: float) -> Tuple[int, int, int]:
-    return tuple(int(max(0, min(255, x * f))) for x in c)
+    """Dim an in-range color by 0 <= f <= 1 (no clamping needed)."""
+    return (int(c[0] * f), int(c[1] * f), int(c[2] * f))
 
 def _lerp_color(c1: Tuple[int,int,int], c2: Tuple[int,int,int], t: float) -> Tuple[int,int,int]:
-    """Linear blend from c1 to c2, t in [0,1]."""
-    t = 0.0 if t < 0 else (1.0 if t > 1 else t)
+    """Linear blend from c1 to c2, t in [0,1] (caller guarantees the range)."""
     return (
         int(c1[0] + (c2[0] - c1[0]) * t),
         int(c1[1] + (c2[1] - c1[1]) * t),
         int(c1[2] + (c2[2] - c1[2]) * t),
     )
 
-def _draw_digits(strip: _Strip, code6: str, color_on: Tuple[int, int, int], color_off: Tuple[int, int, int]):
-    # Clear all digit LEDs first
-    for i in range(NUM_DIGITS * LEDS_PER_DIGIT):
-        strip.set(i, color_off)
-    # Draw each digit
-    for d in range(NUM_DIGITS):
-        ch = code6[d] if d < len(code6) else ' '
-        segs = _segments_for_digit_char(ch)
-        for idx in _leds_for_segments(d, segs):
-            strip.set(idx, color_on)
+# Countdown color from green (full) to red (empty): TIMER_GRADIENT[int(elapsed_frac * 255)]
+TIMER_GRADIENT = tuple(_lerp_color((0, 255, 0), (255, 0, 0), i / 255.0) for i in range(256))
+
+def _draw_digits(strip: _Strip, digits: Tuple[int, ...], color_on: Tuple[int, int, int], color_off: Tuple[int, int, int]):
+    # Positions without a digit are cleared (colors are pre-clamped by the caller)
+    if len(digits) < NUM_DIGITS:
+        if color_off == (0, 0, 0):
+            strip.clear_digits()
+        else:
+            strip.fill_region(0, TIMER_START, color_off)
+    # Each digit (0..9) is one slice copy of its prerendered template, lit and unlit LEDs alike
+    tmpl = strip.digit_templates(color_on, color_off)
+    buf, step = strip._buf, LEDS_PER_DIGIT * 3
+    for d, v in enumerate(digits[:NUM_DIGITS]):
+        o = d * step
+        buf[o:o + step] = tmpl[v]
 
 def _draw_timer(strip: _Strip, seconds_left: float,
                 color: Tuple[int,int,int], period: float = 30.0):
@@ -186,9 +305,9 @@ def _draw_timer(strip: _Strip, seconds_left: float,
     Countdown bar: start FULL and turn off from highest index (151) to lowest (127).
     Smooth boundary by partially lighting the next LED; finished LEDs are OFF.
     """
-    rng = list(_timer_range())            # [126,127,...,150] (0-based)
-    total = len(rng)                      # 25
-    sec = max(0.0, min(period, float(seconds_left)))
+    total = TIMER_LED_COUNT               # 25
+    sec = float(seconds_left)
+    sec = sec if 0.0 <= sec <= period else (0.0 if sec < 0.0 else period)
 
     # remaining fraction (1.0 → full; 0.0 → empty)
     rem = sec / period
@@ -196,34 +315,67 @@ def _draw_timer(strip: _Strip, seconds_left: float,
     full  = int(exact)                    # fully ON from the low end (127 upward)
     frac  = exact - full                  # partial brightness for boundary LED
 
-    for i, idx in enumerate(rng):
+    edge = TIMER_START + full
+    # Most frames only the boundary LED moves; redraw the on/off runs when full or color change
+    key = (full, color)
+    if strip._timer_key != key:
+        strip._timer_key = key
+        strip.fill_region(TIMER_START, edge, color)             # fully on
+        strip.fill_region(edge + 1, TOTAL_PIXELS, (0, 0, 0))    # fully off
+    if full < total:
+        dim = _scale(color, frac) if frac > 0 else (0, 0, 0)
+        strip.set_many((edge,), dim)                            # boundary dim
+
+def _build_frame(buf, digits, on_rgb, full, frac, timer_rgb, phys, lens):
+    """
+    Whole-frame writer over the flat tables: `digits` (ints 0..9, one per position),
+    then `full` timer LEDs in timer_rgb plus one boundary LED dimmed by `frac`.
+    Colors must already be in the strip's wire order (_Strip.wire).
+    Plain scalar loops so numba can compile it (see OTPI_LED_NUMBA).
+    """
+    for o in range(TIMER_START * 3):
+        buf[o] = 0
+    for d in range(min(len(digits), NUM_DIGITS)):
+        v = digits[d]
+        if 0 <= v <= 9:
+            k = d * 10 + v
+            base = k * LEDS_PER_DIGIT
+            for j in range(lens[k]):
+                o = phys[base + j] * 3
+                buf[o] = on_rgb[0]; buf[o + 1] = on_rgb[1]; buf[o + 2] = on_rgb[2]
+    for i in range(TIMER_LED_COUNT):
+        o = (TIMER_START + i) * 3
         if i < full:
-            strip.set(idx, color)         # fully on
-        elif i == full and full < total and frac > 0:
-            strip.set(idx, _scale(color, frac))  # boundary dim
+            buf[o] = timer_rgb[0]; buf[o + 1] = timer_rgb[1]; buf[o + 2] = timer_rgb[2]
+        elif i == full:
+            buf[o] = int(timer_rgb[0] * frac); buf[o + 1] = int(timer_rgb[1] * frac); buf[o + 2] = int(timer_rgb[2] * frac)
         else:
-            strip.set(idx, (0, 0, 0))     # fully off
+            buf[o] = 0; buf[o + 1] = 0; buf[o + 2] = 0
+
+# Optional native frame builder; opt-in because importing numba costs seconds on a Pi.
+# Without it the slice-based _draw_digits/_draw_timer path is the faster one.
+_FRAME_JIT = None
+if os.environ.get("OTPI_LED_NUMBA", "0").lower() not in ("0", "false", "no", "off"):
+    try:
+        from numba import njit
+        _FRAME_JIT = njit(cache=True)(_build_frame)
+    except Exception as e:
+        print(f"[LED] numba frame builder unavailable: {e}")
 
 # ---------- CRITICAL FIX: Enhanced LED initialization for post-reset recovery ----------
 
 def init_led_strip_post_reset(count, brightness, pin_bcm, max_retries=5):
     """
-    Enhanced LED initialization that handles post-reset GPIO issues
+    Enhanced LED initialization that handles post-reset GPIO issues.
+    Tries the strip first; GPIO cleanup only runs once an attempt has failed.
     """
     import subprocess
     
     # Check if we're starting after a reset
     post_reset = os.environ.pop("OTPI_POST_RESET", None)
     if post_reset:
-        print("[LED] Detected post-reset startup, forcing GPIO cleanup...")
-        
-        # Extra cleanup for post-reset state
-        try:
-            # Force kill anything using GPIO
-            subprocess.run(["fuser", "-k", f"/dev/gpiochip0"], capture_output=True)
-            time.sleep(0.5)
-        except Exception:
-            pass
+        print("[LED] Detected post-reset startup")
+    gpio_freed = False
     
     for attempt in range(max_retries):
         try:
@@ -261,6 +413,16 @@ def init_led_strip_post_reset(count, brightness, pin_bcm, max_retries=5):
             if attempt == max_retries - 1:
                 print(f"[LED] All {max_retries} attempts failed, continuing without LEDs")
                 return None
+            # Only now, with a real conflict, force-free the GPIO chip (once)
+            if not gpio_freed and (post_reset or "busy" in str(e).lower() or attempt > 0):
+                gpio_freed = True
+                print("[LED] Forcing GPIO cleanup...")
+                try:
+                    # Force kill anything using GPIO
+                    subprocess.run(["fuser", "-k", "/dev/gpiochip0"], capture_output=True)
+                    time.sleep(0.1)
+                except Exception:
+                    pass
             
     return None
 
@@ -275,9 +437,6 @@ def run_totp_display(secret: str, settings: dict, oled, encoder, wifi_watchdog=N
     except ModuleNotFoundError:
         raise SystemExit("pyotp is required for TOTP: pip install pyotp")
 
-    import time as _time
-    import traceback
-
     period = 30.0  # TOTP window (seconds)
 
     # Force LED count to match mapping
@@ -304,7 +463,7 @@ def run_totp_display(secret: str, settings: dict, oled, encoder, wifi_watchdog=N
     if oled:
         try:
             initial_code = totp.now()
-            ui._draw(initial_code, int(30.0 - (_time.time() % 30.0)))
+            ui._draw(initial_code, int(30.0 - (_now() % 30.0)))
         except Exception as e:
             print(f"[DEBUG] Initial OLED draw failed: {e}")
 
@@ -323,7 +482,7 @@ def run_totp_display(secret: str, settings: dict, oled, encoder, wifi_watchdog=N
                 print(f"[LED] {who}: pin={LED_PIN_BCM}, count={count}, bright={init_bright:.2f}")
                 # Visual confirmation only after successful init
                 try:
-                    s.fill((16, 16, 16)); s.show(); _time.sleep(0.15)
+                    s.fill((16, 16, 16)); s.show(); _sleep(0.15)
                     s.fill((0, 0, 0));    s.show()
                 except Exception as e:
                     print(f"[LED] blink failed: {e}")
@@ -335,9 +494,15 @@ def run_totp_display(secret: str, settings: dict, oled, encoder, wifi_watchdog=N
     # Try LED init (but don't block if it fails)
     strip = _try_init_strip(first=True)
     last_code = None
+    last_window = -1   # TOTP time step of `code`; the code only changes when this does
+    code = ""
+    digits = ()        # code's last NUM_DIGITS chars as ints, refreshed with the code
+    last_frame = None  # inputs of the last LED frame drawn; equal inputs skip drawing
     last_reinit_attempt = 0.0
     
     print("[DEBUG] Starting main display loop...")
+    next_frame = _monotonic()
+    wait_input = getattr(encoder, "wait_activity", None)
 
     try:
         loop_count = 0
@@ -345,12 +510,16 @@ def run_totp_display(secret: str, settings: dict, oled, encoder, wifi_watchdog=N
             loop_count += 1
             
             # Time & code calculation
-            now = _time.time()
+            now = _now()
             secs_left = period - (now % period)
             if secs_left < 0: 
                 secs_left = 0.0
                 
-            code = totp.now()
+            window = int(now // period)
+            if window != last_window:
+                code = totp.now()
+                digits = tuple(ord(c) - 48 for c in code[-NUM_DIGITS:])
+                last_window = window
             if code != last_code:
                 print(f"[DEBUG] New TOTP code: {code} (loop {loop_count})")
                 last_code = code
@@ -403,8 +572,8 @@ def run_totp_display(secret: str, settings: dict, oled, encoder, wifi_watchdog=N
                     except Exception:
                         pass
 
-                import time as _t; _t.sleep(2)
-                import os; os.system("sudo reboot")
+                _sleep(2)
+                os.system("sudo reboot")
                 return
 
             if action == ResetAction.SYNC_TIME:
@@ -418,6 +587,8 @@ def run_totp_display(secret: str, settings: dict, oled, encoder, wifi_watchdog=N
                         pass
                 from main import perform_time_sync
                 perform_time_sync(oled)
+                last_frame = None
+                ui._force_draw_next = True  # sync screens drew over the UI; resend every page
                 # After sync, continue normal operation
                 continue
 
@@ -431,25 +602,40 @@ def run_totp_display(secret: str, settings: dict, oled, encoder, wifi_watchdog=N
             if strip is None and (now - last_reinit_attempt) > 2.0:
                 print("[LED] attempting reinit…")
                 strip = _try_init_strip(first=False)
+                last_frame = None
                 last_reinit_attempt = now
 
             if strip is not None:
                 try:
                     # Apply settings
-                    base_color = _hsv2rgb(hue, 1.0, 1.0)
-                    actual_bright = max(0.0, min(MAX_LED_BRIGHT, (user_pct / 100.0) * MAX_LED_BRIGHT))
-                    
-                    strip.set_brightness(actual_bright)
-
-                    # Draw digits
-                    _draw_digits(strip, code[-NUM_DIGITS:], base_color, (0, 0, 0))
+                    base_color = HUE_LUT[int(hue * HUE_STEPS) % HUE_STEPS]
+                    rem_frac = secs_left / period
+                    rem_frac = rem_frac if 0.0 <= rem_frac <= 1.0 else (0.0 if rem_frac < 0.0 else 1.0)
+
+                    # Same code, color, brightness and timer boundary (to 1/255 of an LED): nothing to redraw
+                    frame = (code, base_color, user_pct, int(rem_frac * TIMER_LED_COUNT * 255))
+                    if frame != last_frame:
+                        last_frame = frame
+                        actual_bright = (user_pct / 100.0) * MAX_LED_BRIGHT
+                        if not 0.0 <= actual_bright <= MAX_LED_BRIGHT:
+                            actual_bright = 0.0 if actual_bright < 0.0 else MAX_LED_BRIGHT
+
+                        strip.set_brightness(actual_bright)
+
+                        timer_color = TIMER_GRADIENT[int((1.0 - rem_frac) * 255)]
+                        if _FRAME_JIT is not None:
+                            exact = rem_frac * TIMER_LED_COUNT
+                            _FRAME_JIT(strip._buf, digits, strip.wire(base_color),
+                                       int(exact), exact - int(exact), strip.wire(timer_color),
+                                       DIGIT_PHYS_FLAT, DIGIT_PHYS_LEN)
+                        else:
+                            # Draw digits
+                            _draw_digits(strip, digits, base_color, (0, 0, 0))
+
+                            # Draw countdown timer
+                            _draw_timer(strip, secs_left, timer_color, period)
 
-                    # Draw countdown timer
-                    rem_frac = max(0.0, min(1.0, secs_left / period))
-                    timer_color = _lerp_color((0, 255, 0), (255, 0, 0), 1.0 - rem_frac)
-                    _draw_timer(strip, secs_left, timer_color, period)
-
-                    strip.show()
+                        strip.show()
 
                 except Exception as e:
                     print(f"[LED] runtime error: {e}")
@@ -460,8 +646,19 @@ def run_totp_display(secret: str, settings: dict, oled, encoder, wifi_watchdog=N
                     strip = None
                     last_reinit_attempt = now
 
-            # Sleep for responsive UI - this was critical for stability
-            _time.sleep(0.05)  # 50ms = 20 FPS, good balance of responsiveness and CPU usage
+            # Sleep until the next frame deadline; encoder input wakes the loop early so
+            # turns and presses are handled at once instead of up to a frame later
+            frame_s = FRAME_IDLE_S if (strip is None and ui._oled_sleeping) else FRAME_S
+            t = _monotonic()
+            if t >= next_frame:
+                next_frame += frame_s
+                if next_frame <= t:
+                    next_frame = t + frame_s  # fell behind; resync
+            next_frame = min(next_frame, t + frame_s)
+            if wait_input is not None:
+                wait_input(next_frame - t)
+            else:
+                _sleep(next_frame - t)
 
     except KeyboardInterrupt:
         print("\n[DEBUG] Keyboard interrupt received")
@@ -3,12 +3,14 @@
 
 import time
 import os
+from functools import lru_cache
 
 # Use your existing LED configuration
 LED_PIN_BCM = int(os.environ.get("OTPI_LED_PIN", 18))
 LED_COUNT = 151  # Your total LED count
 TEST_BRIGHTNESS = 0.80  # power level
 
+@lru_cache(maxsize=8)
 def _board_pin_from_bcm(bcm: int):
     import board
     m = {
@@ -19,6 +21,22 @@ def _board_pin_from_bcm(bcm: int):
     }
     return m.get(bcm) or getattr(board, "D18")
 
+def _fill_grey(strip, level: int):
+    """
+    strip.fill((level, level, level)) as one slice assignment per pixelbuf buffer instead of
+    a Python loop over every pixel. Equal channels make the wire byte order irrelevant.
+    """
+    post = getattr(strip, "_post_brightness_buffer", None)
+    if post is None or getattr(strip, "_bpp", 3) != 3:
+        strip.fill((level, level, level))
+        return
+    off = getattr(strip, "_offset", 0)
+    n = len(strip) * 3
+    pre = getattr(strip, "_pre_brightness_buffer", None)
+    if pre is not None:
+        pre[off:off + n] = bytes((level,)) * n
+    post[off:off + n] = bytes((int(level * strip.brightness),)) * n
+
 def test_max_power():
     try:
         import neopixel
@@ -37,7 +55,7 @@ def test_max_power():
         print("Press Ctrl+C to stop")
         
         # Set all LEDs to bright white (255, 255, 255)
-        strip.fill((255, 255, 255))
+        _fill_grey(strip, 255)
         strip.show()
         
         # Keep them on until interrupted
@@ -46,7 +64,7 @@ def test_max_power():
             
     except KeyboardInterrupt:
         print("\nTurning off LEDs...")
-        strip.fill((0, 0, 0))
+        _fill_grey(strip, 0)
         strip.show()
         strip.deinit()
         print("Test complete")
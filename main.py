@@ -3,16 +3,20 @@
 # FIXED VERSION: Proper resource management and restart handling
 
 from __future__ import annotations
-import os, sys, time, inspect, subprocess, threading
+import os, re, sys, json, time, random, socket, subprocess, threading
 from pathlib import Path
+from contextlib import nullcontext
 from typing import Tuple, Optional
-import time
 
 PROJECT_DIR   = Path(__file__).resolve().parent
 SECRETS_DIR   = PROJECT_DIR / "secrets"
 WIFI_CONFIG   = PROJECT_DIR / "wifi_config.txt"
 SECRET_FILE   = SECRETS_DIR / "otp_secret.txt"
 SECRET_QR_PNG = SECRETS_DIR / "otp_qr.png"
+SETTINGS_FILE = PROJECT_DIR / "user_settings.json"
+
+# ssid= / wpa_passphrase= lines in hostapd.conf (one scan per file)
+_HOSTAPD_RE = re.compile(r"^[ \t]*(ssid|wpa_passphrase)=(.*?)\s*$", re.MULTILINE)
 
 # ---------------- utils (from your project) ----------------
 try:
@@ -39,6 +43,14 @@ except ImportError as e:
         debug_print("Using dummy captive portal - wifi_web.py not available")
         time.sleep(2)
 
+# --- OLED driver (imported once; None when luma isn't installed) ---
+try:
+    from luma.core.render import canvas as _canvas
+    from luma.core.interface.serial import i2c as _i2c
+    from luma.oled.device import ssd1306 as _ssd1306, sh1106 as _sh1106
+except ImportError:
+    _canvas = _i2c = _ssd1306 = _sh1106 = None
+
 # --- i18n support ---
 try:
     import lang
@@ -46,6 +58,48 @@ try:
 except Exception:
     def t(key: str) -> str: return key
 
+# --- I2C bus clock for the OLED ---
+# A full frame is ~1 KB: ~100ms on the wire at the kernel's default 100 kHz, ~25ms at 400 kHz.
+# Linux sets the clock from the device tree only, so all we can do is check it and
+# (opt-in, OTPI_I2C_SET_BAUD=1) add the dtparam to config.txt for the next boot.
+I2C_TARGET_HZ = int(os.environ.get("OTPI_I2C_BAUD", "400000"))
+
+def _i2c_clock_hz(port: int = 1) -> Optional[int]:
+    """Current bus clock from the device tree (a big-endian u32), or None if unknown."""
+    try:
+        raw = Path(f"/sys/class/i2c-adapter/i2c-{port}/of_node/clock-frequency").read_bytes()
+        return int.from_bytes(raw[:4], "big")
+    except Exception:
+        return None
+
+def _check_i2c_baudrate(port: int = 1):
+    hz = _i2c_clock_hz(port)
+    if hz is None:
+        debug_print(f"I2C bus {port} clock unknown")
+        return
+    debug_print(f"I2C bus {port} clock: {hz // 1000} kHz")
+    if hz >= I2C_TARGET_HZ:
+        return
+
+    line = f"dtparam=i2c_arm_baudrate={I2C_TARGET_HZ}"
+    if os.environ.get("OTPI_I2C_SET_BAUD", "0").lower() in ("0", "false", "no", "off"):
+        debug_print(f"OLED updates are slow at {hz // 1000} kHz; add '{line}' to config.txt "
+                    f"(or set OTPI_I2C_SET_BAUD=1) and reboot")
+        return
+    for cfg in (Path("/boot/firmware/config.txt"), Path("/boot/config.txt")):
+        try:
+            if not cfg.exists():
+                continue
+            if "i2c_arm_baudrate" in cfg.read_text(encoding="utf-8"):
+                debug_print(f"{cfg} already sets i2c_arm_baudrate; reboot to apply")
+            else:
+                with open(cfg, "a", encoding="utf-8") as f:
+                    f.write(f"\n{line}\n")
+                debug_print(f"Added '{line}' to {cfg}; takes effect after reboot")
+        except Exception as e:
+            debug_print(f"Could not update {cfg}: {e}")
+        break
+
 # --- FIXED: Enhanced OLED Manager with proper cleanup ---
 class OLEDManager:
     """Manages OLED device lifecycle with proper cleanup"""
@@ -61,8 +115,9 @@ class OLEDManager:
             return self.device
 
         try:
-            from luma.core.interface.serial import i2c
-            from luma.oled.device import ssd1306, sh1106
+            if _i2c is None:
+                debug_print("luma.oled not available, no OLED")
+                return None
 
             # Try common I2C addresses
             addresses = []
@@ -81,22 +136,22 @@ class OLEDManager:
                     debug_print(f"Trying OLED at address 0x{addr:02X}")
 
                     # Create serial interface
-                    self.serial_interface = i2c(port=1, address=addr)
+                    self.serial_interface = _i2c(port=1, address=addr)
 
                     # Try SSD1306 first, then SH1106
                     try:
-                        self.device = ssd1306(self.serial_interface)
+                        self.device = _ssd1306(self.serial_interface)
                         device_type = "SSD1306"
                     except Exception:
-                        self.device = sh1106(self.serial_interface)
+                        self.device = _sh1106(self.serial_interface)
                         device_type = "SH1106"
 
                     # Test the device works
-                    from luma.core.render import canvas
-                    with canvas(self.device) as draw:
+                    with _canvas(self.device) as draw:
                         draw.text((0, 0), "OLED Test", fill=1)
 
                     debug_print(f"OLED init OK at 0x{addr:02X} ({device_type})")
+                    _check_i2c_baudrate(1)
                     self._initialized = True
                     return self.device
 
@@ -132,8 +187,7 @@ class OLEDManager:
         if self.device:
             try:
                 # Clear display before cleanup
-                from luma.core.render import canvas
-                with canvas(self.device) as draw:
+                with _canvas(self.device) as draw:
                     pass  # Empty canvas = clear screen
             except:
                 pass
@@ -154,12 +208,19 @@ class OLEDManager:
         self._initialized = False
         debug_print("OLED interface cleaned")
 
+    def __enter__(self):
+        self.initialize()
+        return self
+
+    def __exit__(self, *exc):
+        self.cleanup()
+        return False
+
     def clear(self):
         """Clear the OLED display"""
         if self.device:
             try:
-                from luma.core.render import canvas
-                with canvas(self.device) as draw:
+                with _canvas(self.device) as draw:
                     pass  # Empty canvas = clear screen
             except Exception as e:
                 debug_print(f"OLED clear failed: {e}")
@@ -175,9 +236,19 @@ class ProgressiveSetupManager:
         self.thread = None
         self.lock = threading.Lock()
 
-        # Completion flags
-        self.webpage_accessed = False
-        self.form_submitted = False
+        # Completion events (set from the web portal's threads) and shutdown event;
+        # the instruction thread blocks on these instead of polling flags
+        self.webpage_event = threading.Event()
+        self.form_event = threading.Event()
+        self.stop_event = threading.Event()
+
+        # Built step messages by (step, language, AP info), and the AP info itself
+        # keyed on the .ap_ssid mtime, so redisplays don't re-read config files
+        self._msg_cache = {}
+        self._ap_info_cache = None
+        self._ap_info_mtime = None
+        self._last_frame_key = None  # (step, messages) currently on the OLED
+        self._composed_frames = {}   # (step, ssid, language) -> (PIL frame, pack_pages() or None)
 
         # Step definitions — advancement is event-driven, not timer-based
         # (welcome and waiting use brief fixed delays; all others wait for events)
@@ -185,7 +256,16 @@ class ProgressiveSetupManager:
 
     def _get_messages(self, step_name: str) -> list:
         """Build step messages dynamically so they use the current language."""
-        ap_ssid, ap_password = self.get_ap_info()
+        ap_info = self.get_ap_info()
+        try:
+            key = (step_name, lang.get_language(), ap_info)
+        except Exception:
+            key = (step_name, "", ap_info)
+        cached = self._msg_cache.get(key)
+        if cached is not None:
+            return cached
+
+        ap_ssid, ap_password = ap_info
         msg_map = {
             "welcome":      [t("setup_title"), t("setup_starting"), t("please_wait")],
             "connect_wifi": [t("setup_step1"), t("setup_connect"), f"Wi-Fi: {ap_ssid}", f"Pass: {ap_password}"],
@@ -193,10 +273,28 @@ class ProgressiveSetupManager:
             "fill_form":    [t("setup_step3"), t("setup_form"), t("setup_on_web"), "192.168.4.1"],
             "waiting":      [t("setup_complete"), t("setup_saved"), t("setup_restarting"), t("please_wait")],
         }
-        return msg_map.get(step_name, ["Unknown step"])
+        messages = self._msg_cache[key] = msg_map.get(step_name, ["Unknown step"])
+        return messages
+
+    def invalidate_cache(self):
+        """Drop the cached messages and AP info (rebuilt on next use)."""
+        self._msg_cache.clear()
+        self._ap_info_cache = None
+        self._ap_info_mtime = None
 
     def get_ap_info(self) -> tuple:
-        """Get the actual AP name and password.
+        """Get the actual AP name and password (cached until .ap_ssid changes)."""
+        try:
+            mtime = (PROJECT_DIR / ".ap_ssid").stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        if self._ap_info_cache is None or mtime != self._ap_info_mtime:
+            self._ap_info_cache = self._read_ap_info()
+            self._ap_info_mtime = mtime
+        return self._ap_info_cache
+
+    def _read_ap_info(self) -> tuple:
+        """Read the actual AP name and password.
         Reads the runtime .ap_ssid file first (unique per board),
         falls back to parsing hostapd.conf."""
         ssid = None
@@ -222,13 +320,12 @@ class ProgressiveSetupManager:
 
             for path in hostapd_paths:
                 try:
-                    content = Path(str(path)).read_text()
-                    for line in content.splitlines():
-                        line = line.strip()
-                        if line.startswith("ssid=") and not ssid:
-                            ssid = line.split("=", 1)[1].strip()
-                        elif line.startswith("wpa_passphrase="):
-                            password = line.split("=", 1)[1].strip()
+                    found = {}
+                    for m in _HOSTAPD_RE.finditer(Path(str(path)).read_text()):
+                        # first ssid= is the primary BSS; later ones belong to extra bss= sections
+                        found.setdefault(m.group(1), m.group(2))
+                    ssid = ssid or found.get("ssid")
+                    password = found.get("wpa_passphrase", password)
                     if ssid:
                         break
                 except Exception:
@@ -245,6 +342,7 @@ class ProgressiveSetupManager:
             if self.running:
                 return
             self.running = True
+            self.stop_event.clear()
 
         self.thread = threading.Thread(target=self._run_instructions, daemon=True)
         self.thread.start()
@@ -254,23 +352,30 @@ class ProgressiveSetupManager:
         """Stop the instruction display"""
         with self.lock:
             self.running = False
+        self.stop_event.set()  # wakes any wait in the instruction thread
 
         if self.thread and self.thread.is_alive():
             self.thread.join(timeout=2.0)
 
         debug_print("Stopping instruction manager")
 
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
     def mark_webpage_accessed(self):
         """Called when someone accesses the web portal"""
         debug_print("mark_webpage_accessed() called")
-        with self.lock:
-            self.webpage_accessed = True
+        self.webpage_event.set()
 
     def mark_form_submitted(self):
         """Called when form is successfully submitted"""
         debug_print("mark_form_submitted() called")
-        with self.lock:
-            self.form_submitted = True
+        self.form_event.set()
 
     def _advance_step(self):
         """Advance to the next step"""
@@ -284,26 +389,35 @@ class ProgressiveSetupManager:
             pass
         return False
 
+    def _wait_for(self, event: threading.Event) -> bool:
+        """Block until `event` is set (returns True) or stop() is called (returns False)."""
+        # set() wakes the wait immediately; the timeout only bounds how late a stop is seen
+        while not event.wait(0.5):
+            if self.stop_event.is_set():
+                return False
+        return True
+
     def _wait_for_device_connection(self):
         """Wait indefinitely for a device to connect to our AP."""
         debug_print("Waiting for device to connect to AP...")
 
         while True:
+            # Kernel neighbour table straight from /proc (one read, no `arp -a` fork per second):
+            # "IP address  HW type  Flags  HW address  Mask  Device"; flags 0x0 = incomplete
             try:
-                result = subprocess.run(['arp', '-a'], capture_output=True, text=True, timeout=2)
-                if result.returncode == 0:
-                    for line in result.stdout.strip().split('\n'):
-                        if '192.168.4.' in line and 'wlan0' in line:
+                with open("/proc/net/arp") as f:
+                    next(f, None)  # header
+                    for line in f:
+                        cols = line.split()
+                        if (len(cols) >= 6 and cols[0].startswith("192.168.4.")
+                                and cols[5] == "wlan0" and cols[2] != "0x0"):
                             debug_print(f"Device connected: {line.strip()}")
                             return True
             except Exception:
                 pass
 
-            time.sleep(1)
-
-            with self.lock:
-                if not self.running:
-                    return False
+            if self.stop_event.wait(1):
+                return False
 
     def _run_instructions(self):
         """Main instruction display loop — steps advance only on real events."""
@@ -320,7 +434,8 @@ class ProgressiveSetupManager:
                 # Handle step-specific logic
                 if self.current_step == "welcome":
                     # Brief splash — only fixed-time step
-                    time.sleep(3)
+                    if self.stop_event.wait(3):
+                        break
                     self._advance_step()
 
                 elif self.current_step == "connect_wifi":
@@ -330,29 +445,19 @@ class ProgressiveSetupManager:
 
                 elif self.current_step == "open_browser":
                     # Wait until the web page is actually opened
-                    while True:
-                        with self.lock:
-                            if not self.running:
-                                return
-                            if self.webpage_accessed:
-                                self._advance_step()
-                                break
-                        time.sleep(0.5)
+                    if not self._wait_for(self.webpage_event):
+                        return
+                    self._advance_step()
 
                 elif self.current_step == "fill_form":
                     # Wait until the form is actually submitted
-                    while True:
-                        with self.lock:
-                            if not self.running:
-                                return
-                            if self.form_submitted:
-                                self._advance_step()
-                                break
-                        time.sleep(0.5)
+                    if not self._wait_for(self.form_event):
+                        return
+                    self._advance_step()
 
                 elif self.current_step == "waiting":
                     # Completion message before restart
-                    time.sleep(3)
+                    self.stop_event.wait(3)
                     break  # Final step
 
                 else:
@@ -369,27 +474,28 @@ class ProgressiveSetupManager:
         if not self.oled:
             return
 
+        # Same step and text as what's on screen: skip the render and I2C push
+        key = (self.current_step, tuple(messages))
+        if key == self._last_frame_key:
+            return
+        self._last_frame_key = key
+
         try:
-            from luma.core.render import canvas
 
             # On the "connect_wifi" step, show a WiFi QR code
             if self.current_step == "connect_wifi":
-                qr_img = self._make_wifi_qr()
-                if qr_img is not None:
-                    with canvas(self.oled) as draw:
-                        # Paste QR onto the canvas's underlying image
-                        draw._image.paste(qr_img, (0, 2))
-                        # Text on the right side
-                        ap_ssid, _ = self.get_ap_info()
-                        draw.text((62, 0),  t("setup_step1"), fill=1)
-                        ssid_short = ap_ssid if len(ap_ssid) <= 11 else ap_ssid[:10] + "\u2026"
-                        draw.text((62, 14), ssid_short, fill=1)
-                        draw.text((62, 30), "Scan QR", fill=1)
-                        draw.text((62, 44), t("setup_connect"), fill=1)
+                composed = self._wifi_qr_frame()
+                if composed is not None:
+                    # Static screen: composed and packed once, then written straight to the panel
+                    frame, pages = composed
+                    if pages is not None:
+                        write_pages(self.oled, page_layout(self.oled), pages)
+                    else:
+                        self.oled.display(frame)
                     return
 
             # Default: show text messages
-            with canvas(self.oled) as draw:
+            with _canvas(self.oled) as draw:
                 y = 0
                 for msg in messages[:4]:  # Max 4 lines on 64px display
                     draw.text((0, y), msg, fill=1)
@@ -397,6 +503,40 @@ class ProgressiveSetupManager:
 
         except Exception as e:
             debug_print(f"OLED display error: {e}")
+            self._last_frame_key = None  # not on screen after all: redraw on the next pass
+
+    def _wifi_qr_frame(self):
+        """The full connect_wifi screen (QR + text) as (PIL image, packed pages), built once per SSID/language."""
+        ap_ssid, _ = self.get_ap_info()
+        try:
+            key = ("connect_wifi", ap_ssid, lang.get_language())
+        except Exception:
+            key = ("connect_wifi", ap_ssid, "")
+        composed = self._composed_frames.get(key)
+        if composed is not None:
+            return composed
+
+        qr_img = self._make_wifi_qr()
+        if qr_img is None:
+            return None
+
+        from PIL import Image, ImageDraw
+        frame = Image.new(self.oled.mode, self.oled.size)
+        frame.paste(qr_img, (0, 2))
+        draw = ImageDraw.Draw(frame)
+        # Text on the right side
+        draw.text((62, 0),  t("setup_step1"), fill=1)
+        ssid_short = ap_ssid if len(ap_ssid) <= 11 else ap_ssid[:10] + "\u2026"
+        draw.text((62, 14), ssid_short, fill=1)
+        draw.text((62, 30), "Scan QR", fill=1)
+        draw.text((62, 44), t("setup_connect"), fill=1)
+        try:
+            pages = pack_pages(self.oled, frame) if page_layout(self.oled) else None
+        except Exception as e:
+            debug_print(f"QR frame packing failed, using display(): {e}")
+            pages = None
+        composed = self._composed_frames[key] = (frame, pages)
+        return composed
 
     def _make_wifi_qr(self):
         """
@@ -452,6 +592,7 @@ except Exception:
 
 # ---------------- LED / UI runtime ----------------
 from led_display import run_totp_display
+from oled_ui import atomic_write, page_layout, pack_pages, write_pages
 try:
     from led_display import DEFAULT_SETTINGS  # {"brightness": 0.50, "hue": 0.33}
 except Exception:
@@ -478,8 +619,7 @@ def perform_time_sync(oled=None):
     # Show instructions on OLED
     if oled:
         try:
-            from luma.core.render import canvas
-            with canvas(oled) as draw:
+            with _canvas(oled) as draw:
                 draw.text((0, 0), "TIME SYNC", fill=1)
                 draw.text((0, 14), "Connect phone to", fill=1)
                 # Get the AP SSID
@@ -507,8 +647,7 @@ def perform_time_sync(oled=None):
             debug_print("Time sync successful via phone")
             if oled:
                 try:
-                    from luma.core.render import canvas
-                    with canvas(oled) as draw:
+                    with _canvas(oled) as draw:
                         draw.text((0, 0), "TIME SYNCED!", fill=1)
                         draw.text((0, 16), "Clock updated", fill=1)
                         draw.text((0, 32), "Returning to", fill=1)
@@ -520,8 +659,7 @@ def perform_time_sync(oled=None):
             debug_print("Time sync timed out")
             if oled:
                 try:
-                    from luma.core.render import canvas
-                    with canvas(oled) as draw:
+                    with _canvas(oled) as draw:
                         draw.text((0, 0), "SYNC TIMEOUT", fill=1)
                         draw.text((0, 16), "No phone connected", fill=1)
                         draw.text((0, 32), "Returning to", fill=1)
@@ -541,46 +679,142 @@ def perform_time_sync(oled=None):
 class WifiWatchdog:
     """
     Background thread that:
-      - Checks WiFi status every CHECK_INTERVAL seconds
+      - Wakes on kernel link/address changes (rtnetlink), with a slow poll as a safety net
       - Reconnects if connection drops (escalates after repeated failures)
-      - Re-syncs NTP every NTP_INTERVAL seconds
+      - Re-syncs NTP every NTP_INTERVAL seconds (own timer, independent of the WiFi checks)
       - Exposes status for the OLED info screen
     """
-    CHECK_INTERVAL = 30       # seconds between WiFi checks
+    CHECK_INTERVAL = 30       # seconds between WiFi checks without netlink
+    BACKOFF_MIN = 5           # first reconnect retry delay while down...
+    BACKOFF_MAX = 300         # ...doubling up to this cap, each with +/-BACKOFF_JITTER
+    BACKOFF_JITTER = 0.2
+    IDLE_CHECK_INTERVAL = 300 # safety-net poll while connected and netlink events are flowing
+    EVENT_SETTLE = 2.0        # let DHCP/association finish before checking after an event
     NTP_INTERVAL = 30 * 60    # 30 minutes between NTP syncs
     FULL_RECONNECT_AFTER = 3  # after this many failed light reconnects, do full connect
 
+    # rtnetlink multicast groups: link up/down and IPv4 address add/remove
+    _RTMGRP_LINK = 0x1
+    _RTMGRP_IPV4_IFADDR = 0x10
+
     def __init__(self):
         self.connected = False
         self.ssid = ""
         self.ip = ""
         self._thread = None
-        self._stop = False
-        self._last_ntp = time.time()  # assume we just synced at boot
+        self._stop_event = threading.Event()
+        self._wake = threading.Event()
+        self._nl_sock = None
+        self._ntp_timer = None
+        self._ntp_lock = threading.Lock()
         self._fail_count = 0
+        self._backoff = self.BACKOFF_MIN
 
     def start(self):
         if self._thread and self._thread.is_alive():
             return
-        self._stop = False
+        self._stop_event.clear()
+        self._open_netlink()
         self._thread = threading.Thread(target=self._run, daemon=True, name="wifi-watchdog")
         self._thread.start()
+        self._schedule_ntp()  # assume we just synced at boot
         debug_print("WiFi watchdog started")
 
     def stop(self):
-        self._stop = True
+        self._stop_event.set()
+        self._wake.set()
+        with self._ntp_lock:
+            if self._ntp_timer:
+                self._ntp_timer.cancel()
+                self._ntp_timer = None
+        sock, self._nl_sock = self._nl_sock, None
+        if sock:
+            try:
+                sock.close()
+            except Exception:
+                pass
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    # --- kernel link events ---
+    def _open_netlink(self):
+        """Subscribe to rtnetlink link/address changes; on failure we just poll."""
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            sock.bind((0, self._RTMGRP_LINK | self._RTMGRP_IPV4_IFADDR))
+            sock.settimeout(1.0)
+            self._nl_sock = sock
+            threading.Thread(target=self._netlink_loop, args=(sock,), daemon=True,
+                             name="wifi-netlink").start()
+        except Exception as e:
+            debug_print(f"WiFi watchdog: netlink unavailable ({e}), polling every {self.CHECK_INTERVAL}s")
+            self._nl_sock = None
+
+    def _netlink_loop(self, sock):
+        while not self._stop_event.is_set():
+            try:
+                if sock.recv(65536):
+                    self._wake.set()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+        debug_print("WiFi watchdog: netlink listener stopped")
+
+    # --- NTP timer chain ---
+    def _schedule_ntp(self):
+        with self._ntp_lock:
+            if self._ntp_timer:
+                self._ntp_timer.cancel()
+            if self._stop_event.is_set():
+                self._ntp_timer = None
+                return
+            self._ntp_timer = threading.Timer(self.NTP_INTERVAL, self._ntp_tick)
+            self._ntp_timer.daemon = True
+            self._ntp_timer.start()
+
+    def _ntp_tick(self):
+        if self._stop_event.is_set():
+            return
+        if self.connected:
+            debug_print("WiFi watchdog: periodic NTP resync...")
+            get_ntp_time()
+        self._schedule_ntp()
+
+    def _sync_ntp_now(self):
+        get_ntp_time()
+        self._schedule_ntp()
 
     def _run(self):
         # Initial status check
         self._check_status()
 
-        while not self._stop:
-            time.sleep(self.CHECK_INTERVAL)
-            if self._stop:
+        next_attempt = 0.0  # monotonic time before which we don't retry a reconnect
+        while not self._stop_event.is_set():
+            if not self.connected:
+                timeout = max(0.0, next_attempt - time.monotonic())
+            elif self._nl_sock is not None:
+                timeout = self.IDLE_CHECK_INTERVAL
+            else:
+                timeout = self.CHECK_INTERVAL
+            if self._wake.wait(timeout) and not self._stop_event.is_set():
+                # Link events come in bursts; give the interface a moment to settle
+                self._stop_event.wait(self.EVENT_SETTLE)
+            self._wake.clear()
+            if self._stop_event.is_set():
                 break
 
             self._check_status()
 
+            if not self.connected and time.monotonic() < next_attempt:
+                continue  # woken by a link event; still down, still backing off
+
             if not self.connected:
                 self._fail_count += 1
                 debug_print(f"WiFi watchdog: connection lost (attempt {self._fail_count})...")
@@ -595,8 +829,7 @@ class WifiWatchdog:
                             if self.connected:
                                 debug_print("WiFi watchdog: full reconnect succeeded")
                                 self._fail_count = 0
-                                get_ntp_time()
-                                self._last_ntp = time.time()
+                                self._sync_ntp_now()
                     else:
                         debug_print("WiFi watchdog: no saved credentials for full reconnect")
                 else:
@@ -606,16 +839,21 @@ class WifiWatchdog:
                         if self.connected:
                             debug_print("WiFi watchdog: reconnected, syncing NTP...")
                             self._fail_count = 0
-                            get_ntp_time()
-                            self._last_ntp = time.time()
+                            self._sync_ntp_now()
+                if not self.connected:
+                    # Exponential backoff with jitter so a rebooting/congested AP isn't hammered
+                    delay = self._backoff * (1 + random.uniform(-self.BACKOFF_JITTER, self.BACKOFF_JITTER))
+                    next_attempt = time.monotonic() + delay
+                    self._backoff = min(self._backoff * 2, self.BACKOFF_MAX)
+                    debug_print(f"WiFi watchdog: next attempt in {delay:.0f}s")
+                # Our own reconnect attempt generates link events; don't treat them as news
+                self._wake.clear()
             else:
                 self._fail_count = 0
 
-            # Periodic NTP resync
-            if self.connected and (time.time() - self._last_ntp) >= self.NTP_INTERVAL:
-                debug_print("WiFi watchdog: periodic NTP resync...")
-                get_ntp_time()
-                self._last_ntp = time.time()
+            if self.connected:
+                self._backoff = self.BACKOFF_MIN
+                next_attempt = 0.0
 
     def _check_status(self):
         status = get_wifi_status()
@@ -682,18 +920,47 @@ def _ip_addrs() -> list[str]:
     except Exception:
         return []
 
+# --- user_settings.json, parsed once and kept in memory ---
+_USER_SETTINGS = None        # parsed dict ({} when missing/unreadable)
+_USER_SETTINGS_MTIME = None  # st_mtime_ns it was parsed from (None = no file)
+
+def user_settings() -> dict:
+    """Parsed user_settings.json. Only re-read when the file changes on disk
+    (the web portal writes it during setup), so repeat lookups cost one stat()."""
+    global _USER_SETTINGS, _USER_SETTINGS_MTIME
+    try:
+        mtime = SETTINGS_FILE.stat().st_mtime_ns
+    except OSError:
+        mtime = None
+    if _USER_SETTINGS is None or mtime != _USER_SETTINGS_MTIME:
+        settings = {}
+        if mtime is not None:
+            try:
+                settings = json.loads(SETTINGS_FILE.read_bytes())
+                if not isinstance(settings, dict):
+                    settings = {}
+            except Exception as e:
+                debug_print(f"user_settings.json read error: {e}")
+        _USER_SETTINGS, _USER_SETTINGS_MTIME = settings, mtime
+    return _USER_SETTINGS
+
+def save_user_setting(key: str, value):
+    """Set one key in user_settings.json, keeping the in-memory copy in sync."""
+    global _USER_SETTINGS, _USER_SETTINGS_MTIME
+    # Change a copy: if the write fails, the cached dict still matches the file
+    settings = dict(user_settings())
+    settings[key] = value
+    # Same temp-file + rename writer oled_ui uses for this file: never a truncated file on disk
+    atomic_write(SETTINGS_FILE, json.dumps(settings, indent=2).encode("utf-8"))
+    _USER_SETTINGS = settings
+    try:
+        _USER_SETTINGS_MTIME = SETTINGS_FILE.stat().st_mtime_ns
+    except OSError:
+        _USER_SETTINGS_MTIME = None
+
 def _is_offline_mode() -> bool:
     """Check if offline mode is enabled in user_settings.json."""
-    settings_file = PROJECT_DIR / "user_settings.json"
-    try:
-        if settings_file.exists():
-            import json
-            with open(settings_file) as f:
-                settings = json.load(f)
-            return bool(settings.get("offline_mode", False))
-    except Exception:
-        pass
-    return False
+    return bool(user_settings().get("offline_mode", False))
 
 
 def need_setup(ssid: Optional[str], pwd: Optional[str], secret_present: bool,
@@ -733,15 +1000,11 @@ def load_secret_text() -> str:
 
 def load_user_settings():
     """Load user preferences with fallback to defaults"""
-    settings_file = PROJECT_DIR / "user_settings.json"
     default_settings = {"brightness": 0.50, "hue": 0.33}
 
     try:
-        if settings_file.exists():
-            import json
-            with open(settings_file, 'r') as f:
-                saved = json.load(f)
-
+        saved = user_settings()
+        if _USER_SETTINGS_MTIME is not None:
             # Validate and merge with defaults
             settings = default_settings.copy()
             if 'hue' in saved:
@@ -786,12 +1049,11 @@ def run_language_picker(oled_device) -> str:
     idx = 0  # start on English
 
     try:
-        from luma.core.render import canvas
-        import time as _time
 
         # Button state for edge detection
         btn_was_pressed = False
         confirmed = False
+        drawn_idx = None  # language currently on screen; redraw only when it changes
 
         debug_print("Language picker started — rotate to browse, press to select")
 
@@ -810,14 +1072,16 @@ def run_language_picker(oled_device) -> str:
             btn_was_pressed = raw_press
 
             # Draw
-            _, native, english = lang.LANGUAGES[idx]
-            with canvas(oled_device) as draw:
-                draw.text((0, 0),  t("lang_title"), fill=1)
-                draw.text((0, 16), f"> {native}", fill=1)
-                draw.text((0, 30), f"  ({english})", fill=1)
-                draw.text((0, 48), t("press_next"), fill=1)
+            if idx != drawn_idx:
+                _, native, english = lang.LANGUAGES[idx]
+                with _canvas(oled_device) as draw:
+                    draw.text((0, 0),  t("lang_title"), fill=1)
+                    draw.text((0, 16), f"> {native}", fill=1)
+                    draw.text((0, 30), f"  ({english})", fill=1)
+                    draw.text((0, 48), t("press_next"), fill=1)
+                drawn_idx = idx
 
-            _time.sleep(0.05)
+            time.sleep(0.05)
 
     except Exception as e:
         debug_print(f"Language picker error: {e}")
@@ -851,22 +1115,16 @@ def run_setup_with_progress_tracking(need_wifi: bool, need_qr: bool, oled_manage
     except Exception as e:
         debug_print(f"Failed to set up portal handler: {e}")
 
-    # Start progress display
-    progress_manager.start()
-
-    try:
-        # Run the captive portal
-        run_captive_portal(need_wifi=need_wifi, need_qr=need_qr)
-
-    except Exception as e:
-        debug_print(f"Setup error: {e}")
-        import traceback
-        traceback.print_exc()
-    finally:
-        # Clean up progress tracking
-        progress_manager.stop()
-        # Give a moment for cleanup
-        time.sleep(0.2)
+    # Progress display runs for as long as the captive portal does
+    with progress_manager:
+        try:
+            run_captive_portal(need_wifi=need_wifi, need_qr=need_qr)
+        except Exception as e:
+            debug_print(f"Setup error: {e}")
+            import traceback
+            traceback.print_exc()
+    # Give a moment for cleanup
+    time.sleep(0.2)
 
     return True
 
@@ -882,249 +1140,217 @@ def main():
     active_count = threading.active_count()
     debug_print(f"Active threads before cleanup: {active_count}")
 
-    # Initialize OLED manager early
-    oled_manager = OLEDManager()
-
-    try:
-        # 1) Try to load/derive requirements BEFORE deciding to portal
-        ssid, pwd, country, language = read_wifi_config()
-
-        # Set OLED language (user_settings.json takes priority over wifi_config.txt)
+    # OLED is cleaned up on every way out of main(), exceptions included
+    with OLEDManager() as oled_manager:
         try:
-            effective_lang = language
-            settings_file = PROJECT_DIR / "user_settings.json"
-            if settings_file.exists():
-                import json as _json
-                with open(settings_file) as _f:
-                    saved = _json.load(_f)
-                if saved.get("language"):
-                    effective_lang = saved["language"]
+            # 1) Try to load/derive requirements BEFORE deciding to portal
+            ssid, pwd, country, language = read_wifi_config()
+
+            # Set OLED language (user_settings.json takes priority over wifi_config.txt)
+            try:
+                effective_lang = language
+                saved_lang = user_settings().get("language")
+                if saved_lang:
+                    effective_lang = saved_lang
                     debug_print(f"Language from user_settings.json: {effective_lang}")
-            lang.set_language(effective_lang)
-        except Exception:
-            pass
+                lang.set_language(effective_lang)
+            except Exception:
+                pass
 
-        # Ensure secret exists (try to derive from a QR image if text missing)
-        secret_present = have_secret_text()
-        if not secret_present:
-            if try_extract_secret_from_qr():
-                secret_present = True
+            # Ensure secret exists (try to derive from a QR image if text missing)
+            secret_present = have_secret_text()
+            if not secret_present:
+                if try_extract_secret_from_qr():
+                    secret_present = True
 
-        # 2) Decide whether we need the setup portal (Wi-Fi and/or QR)
-        need_any, need_wifi, need_qr = need_setup(ssid, pwd, secret_present, country=country)
-        debug_print(f"Setup decision → need_any={need_any} need_wifi={need_wifi} need_qr={need_qr}")
+            # 2) Decide whether we need the setup portal (Wi-Fi and/or QR)
+            need_any, need_wifi, need_qr = need_setup(ssid, pwd, secret_present, country=country)
+            debug_print(f"Setup decision → need_any={need_any} need_wifi={need_wifi} need_qr={need_qr}")
 
-        if need_any:
-            debug_print("Starting Access Point mode...")
+            if need_any:
+                debug_print("Starting Access Point mode...")
 
-            # Initialize OLED for setup instructions
-            oled_device = oled_manager.initialize()
-            if oled_device:
-                debug_print("OLED available for progressive setup instructions")
+                # Initialize OLED for setup instructions
+                oled_device = oled_manager.initialize()
+                if oled_device:
+                    debug_print("OLED available for progressive setup instructions")
 
-            # Language picker — let user choose before the rest of setup
-            chosen_lang = run_language_picker(oled_device)
+                # Language picker — let user choose before the rest of setup
+                chosen_lang = run_language_picker(oled_device)
 
-            # Persist the choice so the web portal pre-selects it and
-            # subsequent boots remember it even before WiFi is configured
-            try:
-                import json as _json
-                sf = PROJECT_DIR / "user_settings.json"
-                saved = {}
-                if sf.exists():
-                    with open(sf) as _f:
-                        saved = _json.load(_f)
-                saved["language"] = chosen_lang
-                with open(sf, "w") as _f:
-                    _json.dump(saved, _f, indent=2)
-                debug_print(f"Saved language '{chosen_lang}' to user_settings.json")
-            except Exception as e:
-                debug_print(f"Failed to persist language choice: {e}")
+                # Persist the choice so the web portal pre-selects it and
+                # subsequent boots remember it even before WiFi is configured
+                try:
+                    save_user_setting("language", chosen_lang)
+                    debug_print(f"Saved language '{chosen_lang}' to user_settings.json")
+                except Exception as e:
+                    debug_print(f"Failed to persist language choice: {e}")
 
-            # Start AP mode
-            from start_ap_mode import start_ap_mode, stop_ap_mode
-            start_ap_mode()
+                # Start AP mode
+                from start_ap_mode import start_ap_mode, stop_ap_mode
+                start_ap_mode()
 
-            try:
-                # Run enhanced setup with progress tracking
-                run_setup_with_progress_tracking(need_wifi, need_qr, oled_manager)
+                try:
+                    # Run enhanced setup with progress tracking
+                    run_setup_with_progress_tracking(need_wifi, need_qr, oled_manager)
+
+                    # If offline mode, run time sync immediately (AP is still active)
+                    if _is_offline_mode():
+                        debug_print("Offline setup complete — starting time sync...")
+                        if oled_device:
+                            try:
+                                with _canvas(oled_device) as draw:
+                                    draw.text((0, 0), "SETUP SAVED!", fill=1)
+                                    draw.text((0, 16), "Now sync time:", fill=1)
+                                    draw.text((0, 32), "Open browser to", fill=1)
+                                    draw.text((0, 48), "192.168.4.1", fill=1)
+                            except Exception:
+                                pass
+
+                        # Run time sync on the already-active AP
+                        from wifi_web import run_time_sync_server
+                        synced = run_time_sync_server(timeout=120)
+                        if synced:
+                            debug_print("Time synced during offline setup")
+                        else:
+                            debug_print("Time sync skipped/timed out during offline setup")
+
+                    # Show completion message
+                    if oled_device:
+                        try:
+                            with _canvas(oled_device) as draw:
+                                draw.text((0, 0), t("setup_complete"), fill=1)
+                                draw.text((0, 16), t("setup_saved"), fill=1)
+                                draw.text((0, 32), t("setup_restarting"), fill=1)
+                            time.sleep(2)
+                        except Exception as e:
+                            debug_print(f"Completion message error: {e}")
+
+                except Exception as e:
+                    debug_print(f"Setup process error: {e}")
 
-                # If offline mode, run time sync immediately (AP is still active)
-                if _is_offline_mode():
-                    debug_print("Offline setup complete — starting time sync...")
+                    # Show error message
                     if oled_device:
                         try:
-                            from luma.core.render import canvas
-                            with canvas(oled_device) as draw:
-                                draw.text((0, 0), "SETUP SAVED!", fill=1)
-                                draw.text((0, 16), "Now sync time:", fill=1)
-                                draw.text((0, 32), "Open browser to", fill=1)
-                                draw.text((0, 48), "192.168.4.1", fill=1)
+                            with _canvas(oled_device) as draw:
+                                draw.text((0, 0), t("setup_error"), fill=1)
+                                draw.text((0, 16), t("setup_check"), fill=1)
+                                draw.text((0, 32), "192.168.4.1", fill=1)
+                            time.sleep(2)
                         except Exception:
                             pass
 
-                    # Run time sync on the already-active AP
-                    from wifi_web import run_time_sync_server
-                    synced = run_time_sync_server(timeout=120)
-                    if synced:
-                        debug_print("Time synced during offline setup")
-                    else:
-                        debug_print("Time sync skipped/timed out during offline setup")
+                finally:
+                    debug_print("Shutting down captive portal")
 
-                # Show completion message
-                if oled_device:
-                    try:
-                        from luma.core.render import canvas
-                        with canvas(oled_device) as draw:
-                            draw.text((0, 0), t("setup_complete"), fill=1)
-                            draw.text((0, 16), t("setup_saved"), fill=1)
-                            draw.text((0, 32), t("setup_restarting"), fill=1)
-                        time.sleep(2)
-                    except Exception as e:
-                        debug_print(f"Completion message error: {e}")
+                    # FIXED: Enhanced cleanup sequence
+                    debug_print("Starting enhanced cleanup sequence")
+                    active_count = threading.active_count()
+                    debug_print(f"Active threads before cleanup: {active_count}")
 
-            except Exception as e:
-                debug_print(f"Setup process error: {e}")
+                    # Clean up OLED
+                    oled_manager.cleanup()
 
-                # Show error message
-                if oled_device:
+                    # Force GPIO subsystem reset attempt
                     try:
-                        from luma.core.render import canvas
-                        with canvas(oled_device) as draw:
-                            draw.text((0, 0), t("setup_error"), fill=1)
-                            draw.text((0, 16), t("setup_check"), fill=1)
-                            draw.text((0, 32), "192.168.4.1", fill=1)
-                        time.sleep(2)
+                        subprocess.run(["gpio", "reset"], capture_output=True)
+                        debug_print("GPIO subsystem reset attempted")
                     except Exception:
                         pass
 
-            finally:
-                debug_print("Shutting down captive portal")
+                    final_count = threading.active_count()
+                    debug_print(f"Final thread count: {final_count}")
 
-                # FIXED: Enhanced cleanup sequence
-                debug_print("Starting enhanced cleanup sequence")
-                active_count = threading.active_count()
-                debug_print(f"Active threads before cleanup: {active_count}")
+                    stop_ap_mode()
 
-                # Clean up OLED
-                oled_manager.cleanup()
+                    # FIXED: Waiting for system cleanup...
+                    debug_print("Waiting for system cleanup...")
+                    time.sleep(1.0)
 
-                # Force GPIO subsystem reset attempt
-                try:
-                    import subprocess
-                    subprocess.run(["gpio", "reset"], capture_output=True)
-                    debug_print("GPIO subsystem reset attempted")
-                except Exception:
-                    pass
+                    # FIXED: Forcing I2C bus reset...
+                    debug_print("Forcing I2C bus reset...")
+                    try:
+                        subprocess.run(["i2cdetect", "-y", "1"], capture_output=True, timeout=2)
+                    except Exception:
+                        pass
 
-                final_count = threading.active_count()
-                debug_print(f"Final thread count: {final_count}")
+                    debug_print("Setup complete, rebooting device...")
+                    time.sleep(1)
+                    os.system("sudo reboot")
+                    return  # not reached
 
-                stop_ap_mode()
+            # 3) All set: we have Wi-Fi and an OTP secret
+            offline = _is_offline_mode()
 
-                # FIXED: Waiting for system cleanup...
-                debug_print("Waiting for system cleanup...")
-                time.sleep(1.0)
+            if offline:
+                debug_print("Offline mode — skipping NTP sync")
+            else:
+                debug_print("Synchronizing time via NTP…")
+                get_ntp_time()
+                debug_print("NTP sync completed")
 
-                # FIXED: Forcing I2C bus reset...
-                debug_print("Forcing I2C bus reset...")
+            # Initialize OLED for normal operation
+            debug_print("Initializing OLED for splash screen...")
+            oled_device = oled_manager.initialize()
+            if oled_device:
+                debug_print("OLED initialized, showing splash")
                 try:
-                    subprocess.run(["i2cdetect", "-y", "1"], capture_output=True, timeout=2)
-                except Exception:
-                    pass
-
-                debug_print("Setup complete, rebooting device...")
-                time.sleep(1)
-                os.system("sudo reboot")
-                return  # not reached
-
-        # 3) All set: we have Wi-Fi and an OTP secret
-        offline = _is_offline_mode()
-
-        if offline:
-            debug_print("Offline mode — skipping NTP sync")
-        else:
-            debug_print("Synchronizing time via NTP…")
-            get_ntp_time()
-            debug_print("NTP sync completed")
+                    with _canvas(oled_device) as draw:
+                        if offline:
+                            draw.text((0, 0),  "Offline Mode", fill=1)
+                        else:
+                            draw.text((0, 0),  t("wifi_ok"), fill=1)
+                            draw.text((0, 12), t("time_ok"), fill=1)
+                        draw.text((0, 24), t("starting"), fill=1)
+                    debug_print("Splash screen displayed")
+                except Exception as e:
+                    debug_print(f"OLED splash failed: {e}")
 
-        # Initialize OLED for normal operation
-        debug_print("Initializing OLED for splash screen...")
-        oled_device = oled_manager.initialize()
-        if oled_device:
-            debug_print("OLED initialized, showing splash")
+            # Initialize encoder (safe to continue without)
+            debug_print("Initializing encoder...")
+            encoder = None
             try:
-                from luma.core.render import canvas
-                with canvas(oled_device) as draw:
-                    if offline:
-                        draw.text((0, 0),  "Offline Mode", fill=1)
-                    else:
-                        draw.text((0, 0),  t("wifi_ok"), fill=1)
-                        draw.text((0, 12), t("time_ok"), fill=1)
-                    draw.text((0, 24), t("starting"), fill=1)
-                debug_print("Splash screen displayed")
+                if Encoder is not None:
+                    encoder = Encoder()
+                    debug_print("Encoder initialized successfully")
             except Exception as e:
-                debug_print(f"OLED splash failed: {e}")
-
-        # Initialize encoder (safe to continue without)
-        debug_print("Initializing encoder...")
-        encoder = None
-        try:
-            if Encoder is not None:
-                encoder = Encoder()
-                debug_print("Encoder initialized successfully")
-        except Exception as e:
-            debug_print(f"Encoder init failed ({e}); continuing without encoder")
+                debug_print(f"Encoder init failed ({e}); continuing without encoder")
 
-        # Load secret
-        debug_print("Loading OTP secret...")
-        secret = load_secret_text()
-        if not secret:
-            print("Fatal: OTP secret missing unexpectedly."); sys.exit(1)
+            # Load secret
+            debug_print("Loading OTP secret...")
+            secret = load_secret_text()
+            if not secret:
+                print("Fatal: OTP secret missing unexpectedly."); sys.exit(1)
 
-        debug_print(f"Secret loaded, length: {len(secret)}")
-        debug_print("About to launch TOTP/LED display...")
+            debug_print(f"Secret loaded, length: {len(secret)}")
+            debug_print("About to launch TOTP/LED display...")
 
-        # 4) Run the LED/OLED TOTP display with user settings
-        print("→ Launching TOTP/LED display (Ctrl-C to quit)\n")
+            # 4) Run the LED/OLED TOTP display with user settings
+            print("→ Launching TOTP/LED display (Ctrl-C to quit)\n")
 
-        # Start WiFi watchdog only if online
-        watchdog = None
-        if not offline:
-            watchdog = WifiWatchdog()
-            watchdog.start()
-        else:
-            debug_print("Offline mode — WiFi watchdog disabled")
+            # WiFi watchdog only if online (stopped on any exit from the display)
+            if offline:
+                debug_print("Offline mode — WiFi watchdog disabled")
 
-        debug_print("Calling run_totp_display...")
-        user_settings = load_user_settings()
-        try:
-            run_totp_display(secret, user_settings, oled=oled_device, encoder=encoder,
-                             wifi_watchdog=watchdog)
-        except KeyboardInterrupt:
-            print("\n→ Exiting on user interrupt")
-        finally:
-            if watchdog:
-                watchdog.stop()
-            try:
-                if encoder:
-                    encoder.close()
-            except Exception:
-                pass
-
-            # Clean up OLED manager
-            oled_manager.cleanup()
+            debug_print("Calling run_totp_display...")
+            led_settings = load_user_settings()
+            with (nullcontext() if offline else WifiWatchdog()) as watchdog:
+                try:
+                    run_totp_display(secret, led_settings, oled=oled_device, encoder=encoder,
+                                     wifi_watchdog=watchdog)
+                except KeyboardInterrupt:
+                    print("\n→ Exiting on user interrupt")
+                finally:
+                    try:
+                        if encoder:
+                            encoder.close()
+                    except Exception:
+                        pass
 
-    except Exception as e:
-        debug_print(f"Main function error: {e}")
-        import traceback
-        traceback.print_exc()
-    finally:
-        # Final cleanup
-        try:
-            oled_manager.cleanup()
-        except Exception:
-            pass
+        except Exception as e:
+            debug_print(f"Main function error: {e}")
+            import traceback
+            traceback.print_exc()
 
 if __name__ == "__main__":
     main()
@@ -1,11 +1,19 @@
 # oled_ui.py - Final working version with settings persistence and i18n
 from __future__ import annotations
-import os, sys, time, subprocess, json
+import os, sys, time, subprocess, json, hashlib
 from pathlib import Path
 from typing import Tuple, Optional
 from lang import t
 import lang
 
+_monotonic_ns = time.monotonic_ns
+
+try:
+    from luma.core.render import canvas as _canvas
+    from PIL import Image, ImageDraw
+except ImportError:
+    _canvas = None
+
 # --- Debug/event logging toggles ---
 ENC_DBG_EVENTS = os.environ.get("OTPI_DEBUG_ENCODER_EVENTS", "0").lower() not in ("0","false","no","off")
 
@@ -14,10 +22,10 @@ def _env_int(name: str, default: int) -> int:
     try: return int(os.environ.get(name, str(default)))
     except Exception: return default
 
-_BURST_MS       = _env_int("OTPI_ENC_BURST_MS", 12)          # total burst duration per frame
 _BURST_INT_MS   = _env_int("OTPI_ENC_BURST_INTERVAL_MS", 1)  # interval between reads
-_BURST_SEC      = max(0.0, _BURST_MS / 1000.0)
 _BURST_INT_SEC  = max(0.0005, _BURST_INT_MS / 1000.0)
+# Reads per frame; the encoder accumulates detents/presses itself, so one is enough
+_BURST_SAMPLES  = max(1, _env_int("OTPI_ENC_BURST_SAMPLES", 1))
 
 # --- Project paths ---
 PROJECT_DIR = Path(__file__).resolve().parent
@@ -29,6 +37,132 @@ MAX_LED_BRIGHT = 0.80  # user 100% -> actual 80%
 SETTINGS_SAVE_DELAY = 2.0  # seconds to wait before saving
 OLED_SLEEP_SECS = 10  # blank OLED after this many seconds of inactivity
 
+# UI timers run on one _monotonic_ns() read per frame; thresholds in integer ns
+SETTINGS_SAVE_DELAY_NS = int(SETTINGS_SAVE_DELAY * 1e9)
+OLED_SLEEP_NS          = OLED_SLEEP_SECS * 1_000_000_000
+BTN_DEBOUNCE_NS        = 100_000_000   # 100ms between accepted presses
+SCREEN_CHANGE_NS       = 200_000_000   # 200ms minimum between screen changes
+DRAW_INTERVAL_NS       = 50_000_000    # 50ms max between draws on static screens
+
+def atomic_write(target: Path, payload: bytes):
+    """Durably replace `target`: exclusive O_DSYNC temp file, rename, then fsync the directory."""
+    temp = target.with_name(target.name + ".tmp")
+    try:
+        temp.unlink()  # stale temp left by a power cut would block O_EXCL
+    except FileNotFoundError:
+        pass
+    # O_DSYNC makes the write itself reach stable storage, so no separate fsync is needed
+    dsync = getattr(os, "O_DSYNC", 0)
+    fd = os.open(str(temp), os.O_WRONLY | os.O_CREAT | os.O_EXCL | dsync, 0o644)
+    try:
+        os.write(fd, payload)
+        if not dsync:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(temp, target)
+    # the rename is atomic but only durable once the directory entry hits the disk
+    try:
+        dfd = os.open(str(target.parent), os.O_DIRECTORY)
+        try:
+            os.fsync(dfd)
+        finally:
+            os.close(dfd)
+    except Exception:
+        pass
+
+def page_layout(device) -> Optional[str]:
+    """"ssd1306"/"sh1106" when `device` is an unrotated 128x64 panel whose RAM pages we can
+    write directly, else None (use device.display())."""
+    kind = type(device).__name__
+    if kind not in ("ssd1306", "sh1106") or getattr(device, "rotate", 0) != 0 \
+            or tuple(device.size) != (128, 64):
+        return None
+    return kind
+
+def pack_pages(device, image) -> list:
+    """A finished frame as the controller's 8 pages of 128 column bytes (bit 0 = top row)."""
+    image = device.preprocess(image)
+    # Rotated 90° clockwise, each packed row of 8 bytes is one column with the bottom
+    # page first and bit 0 = top pixel of a page, i.e. the controller's GDDRAM layout
+    raw = image.transpose(Image.Transpose.ROTATE_270).tobytes()
+    return [raw[7 - p::8] for p in range(8)]
+
+def write_pages(device, kind: str, pages: list):
+    """Write a full pack_pages() frame to a page_layout() panel."""
+    if kind == "ssd1306":
+        # horizontal addressing: one window covering the whole panel
+        device.command(0x21, 0, 127, 0x22, 0, 7)  # COLUMNADDR, PAGEADDR
+        device.data(list(b"".join(pages)))
+    else:
+        for p, page in enumerate(pages):
+            _write_page_span(device, kind, p, 0, page)
+
+def _write_page_span(device, kind: str, page: int, col: int, data: bytes):
+    if kind == "ssd1306":
+        device.command(0x21, col, col + len(data) - 1, 0x22, page, page)
+    else:
+        col += 2  # SH1106 RAM is 132 columns wide; the panel starts at column 2
+        device.command(0xB0 + page, col & 0x0F, 0x10 | (col >> 4))
+    device.data(list(data))
+
+class _PageFlusher:
+    """
+    Pushes frames to a 128x64 SSD1306/SH1106 one 8-row page at a time, sending only the
+    column span of each page that differs from the previous frame. A frame change that
+    only touches the OTP countdown then costs a few dozen bytes on I2C instead of the
+    full 1 KB buffer. Anything else (other drivers, rotation, no previous frame) falls
+    back to a full device.display().
+    """
+    def __init__(self, device):
+        self.dev = device
+        self.kind = page_layout(device)
+        self.pages = None  # bytes per page as last sent; None = unknown panel contents
+
+    def invalidate(self):
+        self.pages = None
+
+    def flush(self, image):
+        dev = self.dev
+        if self.kind is None:
+            dev.display(image)
+            return
+        pages = pack_pages(dev, image)
+        prev = self.pages
+        if prev is None:
+            write_pages(dev, self.kind, pages)
+            self.pages = pages
+            return
+        for p, page in enumerate(pages):
+            old = prev[p]
+            if page == old:
+                continue
+            lo = 0
+            while page[lo] == old[lo]:
+                lo += 1
+            hi = 127
+            while page[hi] == old[hi]:
+                hi -= 1
+            _write_page_span(dev, self.kind, p, lo, page[lo:hi + 1])
+        self.pages = pages
+
+class _partial_canvas:
+    """Drop-in for luma's canvas() that flushes through a _PageFlusher."""
+    def __init__(self, flusher: _PageFlusher):
+        self.flusher = flusher
+
+    def __enter__(self):
+        dev = self.flusher.dev
+        self.image = Image.new(dev.mode, dev.size)
+        return ImageDraw.Draw(self.image)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flusher.flush(self.image)
+        else:
+            self.flusher.invalidate()
+        return False
+
 class ResetAction:
     NONE = "none"
     WIFI = "wifi"
@@ -37,6 +171,14 @@ class ResetAction:
     SYNC_TIME = "sync_time"
     WIFI_TOGGLE = "wifi_toggle"
 
+# Options menu entries (None = Next/back)
+# Offline: Next, Turn WiFi On, Sync Time, Reset WiFi, Reset QR, Reset Both
+_MENU_OFFLINE = (None, ResetAction.WIFI_TOGGLE, ResetAction.SYNC_TIME,
+                 ResetAction.WIFI, ResetAction.QR, ResetAction.BOTH)
+# Online: Next, Turn WiFi Off, Reset WiFi, Reset QR, Reset Both
+_MENU_ONLINE = (None, ResetAction.WIFI_TOGGLE,
+                ResetAction.WIFI, ResetAction.QR, ResetAction.BOTH)
+
 class OledUI:
     """
     5-screen UI:
@@ -47,6 +189,21 @@ class OledUI:
       4 Options menu (Next, Sync Time, Reset Wi-Fi, Reset QR, Reset Both)
       5 Confirm screen (PRESS = confirm; ROTATE = cancel/back)
     """
+    # Fixed attribute set: slot loads on the per-frame paths instead of __dict__ lookups
+    __slots__ = (
+        "oled", "screen", "selection", "confirm_for", "hue", "user_pct",
+        "_settings_sel", "_settings_editing",
+        "_lang_codes", "_lang_idx", "_last_saved_lang", "_screen_strings",
+        "_last_draw_ts", "_last_draw_key", "_flusher", "_screen_handlers",
+        "_enc", "_enc_steps", "_enc_pressed",
+        "_btn_was_pressed", "_btn_debounce_time", "_last_screen_change", "_force_draw_next",
+        "_last_setting_change", "_settings_dirty", "_last_saved_hue", "_last_saved_brightness",
+        "_last_saved_digest",
+        "_last_activity", "_oled_sleeping",
+        "_wifi_ssid", "_wifi_connected", "_wifi_ip",
+        "_version", "_offline",
+    )
+
     def __init__(self, oled, initial_hue: float, user_brightness_pct: int):
         self.oled = oled
         self.screen = 0  # Start on info screen
@@ -71,29 +228,41 @@ class OledUI:
             self._lang_idx = 0
         self._last_saved_lang = self._lang_codes[self._lang_idx]
 
-        self._last_draw_ts = 0.0
+        # Translated labels per screen for the current language (rebuilt on language change)
+        self._screen_strings = ()
+        self._rebuild_screen_strings()
+
+        self._last_draw_ts = 0
+        self._last_draw_key = ()  # inputs of the last frame actually drawn
+        # Page-diffing flush so unchanged OLED pages aren't resent over I2C
+        self._flusher = _PageFlusher(oled) if oled and _canvas is not None else None
+
+        # Input handler per screen index
+        self._screen_handlers = (self._h_info, self._h_settings, self._h_language,
+                                 self._h_debug, self._h_options, self._h_confirm)
+
+        # Bound steps()/pressed() of the encoder last seen by handle()
+        self._enc = None
+        self._enc_steps = None
+        self._enc_pressed = None
 
         # Button state tracking for proper edge detection
         self._btn_was_pressed = False
-        self._btn_debounce_time = 0.0
-        self._last_screen_change = time.perf_counter()
+        self._btn_debounce_time = -BTN_DEBOUNCE_NS
+        self._last_screen_change = _monotonic_ns()
 
         # Force initial draw of info screen
         self._force_draw_next = True
 
-        # Scrolling text for reset screen
-        self._scroll_pos = 0
-        self._scroll_timer = 0.0
-        self._scroll_speed = 0.5  # seconds between character advances
-
         # Settings auto-save tracking
-        self._last_setting_change = 0.0
+        self._last_setting_change = 0
         self._settings_dirty = False
         self._last_saved_hue = self.hue
         self._last_saved_brightness = self.user_pct
+        self._last_saved_digest = None  # sha256 of the last persisted settings file
 
         # OLED sleep/wake tracking
-        self._last_activity = time.perf_counter()
+        self._last_activity = _monotonic_ns()
         self._oled_sleeping = False
 
         # WiFi status (updated externally via set_wifi_status)
@@ -129,8 +298,7 @@ class OledUI:
         """Load user settings from JSON file"""
         try:
             if SETTINGS_FILE.exists():
-                with open(SETTINGS_FILE, 'r') as f:
-                    settings = json.load(f)
+                settings = json.loads(SETTINGS_FILE.read_bytes())
                 print(f"[UI] Loaded settings from {SETTINGS_FILE}")
                 return settings
         except Exception as e:
@@ -144,19 +312,27 @@ class OledUI:
                 'hue': float(self.hue),
                 'brightness': int(self.user_pct),
                 'language': self._lang_codes[self._lang_idx],
-                'saved_at': time.time()
             }
+            cur_lang = settings['language']
+
+            # No wall-clock timestamp in the payload: identical settings give identical bytes,
+            # so the same content as the last save skips the disk write entirely
+            payload = json.dumps(settings, indent=2).encode("utf-8")
+            digest = hashlib.sha256(payload).digest()
+            if digest == self._last_saved_digest:
+                self._last_saved_hue = self.hue
+                self._last_saved_brightness = self.user_pct
+                self._last_saved_lang = cur_lang
+                self._settings_dirty = False
+                return
 
             # Ensure directory exists
             SETTINGS_FILE.parent.mkdir(parents=True, exist_ok=True)
 
-            # Write atomically (write to temp file, then rename)
-            temp_file = SETTINGS_FILE.with_suffix('.json.tmp')
-            with open(temp_file, 'w') as f:
-                json.dump(settings, f, indent=2)
-            temp_file.replace(SETTINGS_FILE)
+            # Write atomically and durably (temp file + fsync, rename, directory fsync)
+            atomic_write(SETTINGS_FILE, payload)
+            self._last_saved_digest = digest
 
-            cur_lang = self._lang_codes[self._lang_idx]
             print(f"[UI] Saved settings: hue={self.hue:.3f}, brightness={self.user_pct}%, lang={cur_lang}")
 
             # Also update wifi_config.txt line 4 so next boot picks it up
@@ -176,63 +352,63 @@ class OledUI:
         try:
             if not WIFI_CONFIG.exists():
                 return
-            lines = WIFI_CONFIG.read_text(encoding="utf-8").splitlines()
+            lines = WIFI_CONFIG.read_bytes().splitlines()
+            want = lang_code.encode("utf-8")
+            if len(lines) >= 4 and lines[3] == want:
+                return  # already current; don't rewrite the file
             # Ensure at least 4 lines (ssid, pwd, country, lang)
             while len(lines) < 4:
-                lines.append("")
-            lines[3] = lang_code
-            WIFI_CONFIG.write_text("\n".join(lines) + "\n", encoding="utf-8")
+                lines.append(b"")
+            lines[3] = want
+            WIFI_CONFIG.write_bytes(b"\n".join(lines) + b"\n")
         except Exception as e:
             print(f"[UI] Failed to update wifi_config language: {e}")
 
-    def _check_auto_save(self):
-        """Check if settings need to be auto-saved after delay"""
-        now = time.perf_counter()
-
-        # Check if settings changed
-        hue_changed = abs(self.hue - self._last_saved_hue) > 0.001
-        brightness_changed = self.user_pct != self._last_saved_brightness
-        lang_changed = self._lang_codes[self._lang_idx] != self._last_saved_lang
+    def _check_auto_save(self, now: Optional[int] = None):
+        """Check if settings need to be auto-saved after delay (now: monotonic ns)"""
+        if now is None:
+            now = _monotonic_ns()
 
-        if hue_changed or brightness_changed or lang_changed:
-            # FIXED: Only update timestamp if we weren't already dirty
-            if not self._settings_dirty:
-                print(f"[UI] Settings became dirty, starting timer")
-                self._settings_dirty = True
-                self._last_setting_change = now
-            # If already dirty, don't reset the timer - keep the original timestamp
-
-        # Auto-save if dirty and delay elapsed
+        # Auto-save if dirty (set by _mark_dirty at the edit sites) and delay elapsed
+        if not self._settings_dirty:
+            return
         time_since_change = now - self._last_setting_change
-        if (self._settings_dirty and time_since_change >= SETTINGS_SAVE_DELAY):
-            print(f"[UI] Auto-saving settings after {time_since_change:.1f}s delay")
+        if time_since_change >= SETTINGS_SAVE_DELAY_NS:
+            print(f"[UI] Auto-saving settings after {time_since_change / 1e9:.1f}s delay")
             self._save_settings()
 
+    def _mark_dirty(self, now: int):
+        """Called where a persisted setting is edited; starts the auto-save delay."""
+        # Only start the timer on the first edit - keep the original timestamp while dirty
+        if not self._settings_dirty:
+            print(f"[UI] Settings became dirty, starting timer")
+            self._settings_dirty = True
+            self._last_setting_change = now
+
     # --- main entry each frame ---
     def handle(self, encoder, code: str, secs_left: int) -> Tuple[float,int,str]:
         """
         Reads encoder with burst sampling, updates UI, draws OLED.
         Returns (hue, user_pct, reset_action).
         """
+        now = _monotonic_ns()  # the only clock read this frame
         if not encoder:
             # No encoder available — still handle sleep timer
-            now = time.perf_counter()
-            if (now - self._last_activity) >= OLED_SLEEP_SECS:
+            if (now - self._last_activity) >= OLED_SLEEP_NS:
                 if not self._oled_sleeping:
                     self._sleep_oled()
             elif not self._oled_sleeping:
-                self._draw(code, secs_left)
-            self._check_auto_save()
+                self._draw(code, secs_left, now)
+            self._check_auto_save(now)
             return (self.hue, self.user_pct, ResetAction.NONE)
 
         step, raw_press = self._read_inputs_safer(encoder)
 
         # Improved button edge detection with debouncing
-        now = time.perf_counter()
         pressed_edge = False
 
         if raw_press and not self._btn_was_pressed:
-            if now - self._btn_debounce_time > 0.1:  # 100ms debounce
+            if now - self._btn_debounce_time > BTN_DEBOUNCE_NS:
                 pressed_edge = True
                 self._btn_debounce_time = now
 
@@ -244,15 +420,20 @@ class OledUI:
         if self._oled_sleeping:
             if has_activity:
                 # Wake up — consume the input so it doesn't also change screens
-                self._wake_oled()
-            self._check_auto_save()
+                self._wake_oled(now)
+            self._check_auto_save(now)
             return (self.hue, self.user_pct, ResetAction.NONE)
 
         if has_activity:
             self._last_activity = now
-        elif (now - self._last_activity) >= OLED_SLEEP_SECS:
+        elif (now - self._last_activity) >= OLED_SLEEP_NS:
             self._sleep_oled()
-            self._check_auto_save()
+            self._check_auto_save(now)
+            return (self.hue, self.user_pct, ResetAction.NONE)
+
+        # Idle info screen with nothing pending: skip the state machine, only (maybe) redraw
+        if not has_activity and self.screen == 0 and not self._settings_dirty:
+            self._draw(code, secs_left, now)
             return (self.hue, self.user_pct, ResetAction.NONE)
 
         if ENC_DBG_EVENTS:
@@ -261,147 +442,158 @@ class OledUI:
             if pressed_edge:
                 print("[ENC] pressed(edge)")
 
-        reset_action = ResetAction.NONE
         old_screen = self.screen
 
         # Prevent screen changes too quickly
-        screen_change_delay = 0.2  # 200ms minimum between screen changes
-        can_change_screen = (now - self._last_screen_change) > screen_change_delay
+        can_change_screen = (now - self._last_screen_change) > SCREEN_CHANGE_NS
 
-        # Screen logic
-        if self.screen == 0:  # Basic/Info
-            if pressed_edge and can_change_screen:
-                self.screen = 1
-                self._settings_sel = 0
-                self._settings_editing = False
-                self._last_screen_change = now
+        # Screen logic: one table lookup instead of an if/elif chain
+        reset_action = self._screen_handlers[self.screen](step, pressed_edge, can_change_screen, now) or ResetAction.NONE
 
-        elif self.screen == 1:  # Settings (Color + Brightness)
-            if self._settings_editing:
-                # In edit mode: rotate changes the value, press exits edit
-                if step:
-                    if self._settings_sel == 1:  # Hue
-                        self.hue = (self.hue + step * 0.01) % 1.0
-                    elif self._settings_sel == 2:  # Brightness
-                        self.user_pct = int(max(0, min(100, self.user_pct + step)))
-                if pressed_edge and can_change_screen:
-                    self._settings_editing = False
-                    self._last_screen_change = now
-            else:
-                # In select mode: rotate picks item, press enters edit or goes next
-                if step:
-                    self._settings_sel = (self._settings_sel + step) % 3
-                if pressed_edge and can_change_screen:
-                    if self._settings_sel == 0:  # "Next" selected
-                        self.screen = 2
-                    else:
-                        self._settings_editing = True
-                    self._last_screen_change = now
+        if self.screen != old_screen:
+            print(f"[UI] screen {old_screen} → {self.screen}")
+            self._force_draw_next = True
 
-        elif self.screen == 2:  # Language
-            if step:
-                self._lang_idx = (self._lang_idx + step) % len(self._lang_codes)
-                lang.set_language(self._lang_codes[self._lang_idx])
-            if pressed_edge and can_change_screen:
-                self.screen = 3
-                self._last_screen_change = now
+        self._draw(code, secs_left, now)
+        self._check_auto_save(now)
+        return (self.hue, self.user_pct, reset_action)
 
-        elif self.screen == 3:  # Debug
+    # --- per-screen input handlers: (step, pressed_edge, can_change_screen, now) -> reset action or None ---
+    def _h_info(self, step, pressed_edge, can_change_screen, now):
+        if pressed_edge and can_change_screen:
+            self.screen = 1
+            self._settings_sel = 0
+            self._settings_editing = False
+            self._last_screen_change = now
+
+    def _h_settings(self, step, pressed_edge, can_change_screen, now):
+        if self._settings_editing:
+            # In edit mode: rotate changes the value, press exits edit
+            if step:
+                if self._settings_sel == 1:  # Hue
+                    self.hue = (self.hue + step * 0.01) % 1.0
+                    self._mark_dirty(now)
+                elif self._settings_sel == 2:  # Brightness
+                    self.user_pct = int(max(0, min(100, self.user_pct + step)))
+                    self._mark_dirty(now)
             if pressed_edge and can_change_screen:
-                self.screen = 4
-                self.selection = 0
+                self._settings_editing = False
                 self._last_screen_change = now
-
-        elif self.screen == 4:  # Options menu
-            # Build dynamic menu based on mode
-            if self._offline:
-                # Offline: Next, Turn WiFi On, Sync Time, Reset WiFi, Reset QR, Reset Both
-                menu_actions = [None, ResetAction.WIFI_TOGGLE, ResetAction.SYNC_TIME,
-                                ResetAction.WIFI, ResetAction.QR, ResetAction.BOTH]
-            else:
-                # Online: Next, Turn WiFi Off, Reset WiFi, Reset QR, Reset Both
-                menu_actions = [None, ResetAction.WIFI_TOGGLE,
-                                ResetAction.WIFI, ResetAction.QR, ResetAction.BOTH]
-
-            menu_count = len(menu_actions)
+        else:
+            # In select mode: rotate picks item, press enters edit or goes next
             if step:
-                self.selection = (self.selection + step) % menu_count
+                self._settings_sel = (self._settings_sel + step) % 3
             if pressed_edge and can_change_screen:
-                action_val = menu_actions[self.selection]
-                if action_val is None:
-                    self.screen = 0  # Next/back
-                elif action_val == ResetAction.WIFI_TOGGLE:
-                    reset_action = ResetAction.WIFI_TOGGLE
-                    self._offline = not self._offline
-                    self.screen = 0
-                elif action_val == ResetAction.SYNC_TIME:
-                    reset_action = ResetAction.SYNC_TIME
-                    self.screen = 0
-                elif action_val in (ResetAction.WIFI, ResetAction.QR, ResetAction.BOTH):
-                    self.screen = 5
-                    self.confirm_for = action_val
+                if self._settings_sel == 0:  # "Next" selected
+                    self.screen = 2
+                else:
+                    self._settings_editing = True
                 self._last_screen_change = now
 
-        elif self.screen == 5:  # Confirm
-            # ROTATE = cancel/back, PRESS(edge) = confirm
-            if step and can_change_screen:
+    def _h_language(self, step, pressed_edge, can_change_screen, now):
+        if step:
+            self._lang_idx = (self._lang_idx + step) % len(self._lang_codes)
+            lang.set_language(self._lang_codes[self._lang_idx])
+            self._rebuild_screen_strings()
+            self._mark_dirty(now)
+        if pressed_edge and can_change_screen:
+            self.screen = 3
+            self._last_screen_change = now
+
+    def _h_debug(self, step, pressed_edge, can_change_screen, now):
+        if pressed_edge and can_change_screen:
+            self.screen = 4
+            self.selection = 0
+            self._last_screen_change = now
+
+    def _h_options(self, step, pressed_edge, can_change_screen, now):
+        # Menu depends on mode (see _MENU_OFFLINE / _MENU_ONLINE)
+        menu_actions = _MENU_OFFLINE if self._offline else _MENU_ONLINE
+        reset_action = None
+
+        menu_count = len(menu_actions)
+        if step:
+            self.selection = (self.selection + step) % menu_count
+        if pressed_edge and can_change_screen:
+            action_val = menu_actions[self.selection]
+            if action_val is None:
+                self.screen = 0  # Next/back
+            elif action_val == ResetAction.WIFI_TOGGLE:
+                reset_action = ResetAction.WIFI_TOGGLE
+                self._offline = not self._offline
                 self.screen = 0
-                self.confirm_for = None
-                self._last_screen_change = now
-            elif pressed_edge and can_change_screen:
-                if self.confirm_for:
-                    reset_action = self.confirm_for
-                    print(f"[UI] Reset action confirmed: {reset_action}")
+            elif action_val == ResetAction.SYNC_TIME:
+                reset_action = ResetAction.SYNC_TIME
                 self.screen = 0
-                self.confirm_for = None
-                self._last_screen_change = now
-
-        if self.screen != old_screen:
-            print(f"[UI] screen {old_screen} → {self.screen}")
-            self._force_draw_next = True
-            # Reset scroll position when entering reset screen
-            if self.screen == 4:
-                self._scroll_pos = 0
-                self._scroll_timer = time.time()
-
-        self._draw(code, secs_left)
-        self._check_auto_save()
-        return (self.hue, self.user_pct, reset_action)
+            elif action_val in (ResetAction.WIFI, ResetAction.QR, ResetAction.BOTH):
+                self.screen = 5
+                self.confirm_for = action_val
+            self._last_screen_change = now
+        return reset_action
+
+    def _h_confirm(self, step, pressed_edge, can_change_screen, now):
+        # ROTATE = cancel/back, PRESS(edge) = confirm
+        reset_action = None
+        if step and can_change_screen:
+            self.screen = 0
+            self.confirm_for = None
+            self._last_screen_change = now
+        elif pressed_edge and can_change_screen:
+            if self.confirm_for:
+                reset_action = self.confirm_for
+                print(f"[UI] Reset action confirmed: {reset_action}")
+            self.screen = 0
+            self.confirm_for = None
+            self._last_screen_change = now
+        return reset_action
+
+    def _rebuild_screen_strings(self):
+        """Translate every static label once; _draw indexes _screen_strings[screen]."""
+        def esc(s: str) -> str:
+            return s.replace("%", "%%")
+        def fit(opts) -> tuple:
+            # menu rows hold 20 chars including the "> " prefix
+            return tuple(o if len(o) <= 18 else o[:17] + "..." for o in opts)
+        self._screen_strings = (
+            # 0 Info: line templates (otp, time, hue, bright) filled with % per frame, press_next
+            (esc(t("otp")) + "  : %s", esc(t("time")) + " : %2ds",
+             esc(t("hue")) + "  : %3d\xb0", esc(t("bright")) + ": %3d%%", t("press_next")),
+            # 1 Settings: next_screen, hue, bright
+            (t("next_screen"), t("hue"), t("bright")),
+            # 2 Language: lang_title, rotate_lang, press_next
+            (t("lang_title"), t("rotate_lang"), t("press_next")),
+            # 3 Debug: untranslated
+            (),
+            # 4 Options: offline menu, online menu (same order as _MENU_OFFLINE / _MENU_ONLINE),
+            #   already truncated to the row width
+            (fit((t("next_screen"), "Turn WiFi On", "Sync Time", t("reset_wifi"), t("reset_qr"), t("reset_both"))),
+             fit((t("next_screen"), "Turn WiFi Off", t("reset_wifi"), t("reset_qr"), t("reset_both")))),
+            # 5 Confirm: title, press_yes, rotate_cancel, restarts_after, label per action
+            (t("confirm_title"), t("press_yes"), t("rotate_cancel"), t("restarts_after"),
+             {ResetAction.WIFI: t("confirm_wifi"),
+              ResetAction.QR:   t("confirm_qr"),
+              ResetAction.BOTH: t("confirm_both")}),
+        )
 
     def actual_brightness(self) -> float:
         return (self.user_pct / 100.0) * MAX_LED_BRIGHT
 
-    def _get_scrolling_text(self, text: str, max_width: int = 21) -> str:
-        """Get scrolling text that fits within max_width characters"""
-        if len(text) <= max_width:
-            return text
-
-        now = time.time()
-        if now - self._scroll_timer >= self._scroll_speed:
-            self._scroll_pos = (self._scroll_pos + 1) % (len(text) + 3)  # +3 for spacing
-            self._scroll_timer = now
-
-        # Create scrolling effect with padding
-        extended_text = text + "   " + text  # Add spacing and repeat
-        start_pos = self._scroll_pos % len(extended_text)
-        visible_text = extended_text[start_pos:start_pos + max_width]
-
-        # If we don't have enough characters, wrap around
-        if len(visible_text) < max_width:
-            visible_text += extended_text[:max_width - len(visible_text)]
-
-        return visible_text
-
     # --- Safer encoder reading with better error handling ---
     def _read_inputs_safer(self, encoder) -> Tuple[int, bool]:
         total_steps = 0
         any_press = False
-
-        # Read multiple times over a short period for better responsiveness
-        samples = 5
-        for _ in range(samples):
+        if encoder is not self._enc:
+            self._enc = encoder
+            self._enc_steps, self._enc_pressed = encoder.steps, encoder.pressed
+        steps, pressed = self._enc_steps, self._enc_pressed
+
+        # Encoder counts detents and latches presses between calls, so a single read
+        # per frame loses nothing; extra spaced samples only if explicitly configured
+        for i in range(_BURST_SAMPLES):
+            if i:
+                time.sleep(_BURST_INT_SEC)
             try:
-                s = encoder.steps()
+                s = steps()
                 if s:
                     total_steps += s
             except Exception as e:
@@ -409,14 +601,12 @@ class OledUI:
                     print(f"[ENC] steps() error: {e}")
 
             try:
-                if encoder.pressed():
+                if pressed():
                     any_press = True
             except Exception as e:
                 if ENC_DBG_EVENTS:
                     print(f"[ENC] pressed() error: {e}")
 
-            time.sleep(0.002)  # 2ms between samples
-
         return total_steps, any_press
 
     # --- OLED sleep/wake ---
@@ -425,64 +615,79 @@ class OledUI:
         if self._oled_sleeping:
             return
         self._oled_sleeping = True
-        if self.oled:
+        if self.oled and _canvas is not None:
             try:
-                from luma.core.render import canvas
-                with canvas(self.oled) as draw:
+                with _partial_canvas(self._flusher) as draw:
                     pass  # draw nothing → blank screen
                 print("[UI] OLED sleeping (burn-in protection)")
             except Exception:
                 pass
 
-    def _wake_oled(self):
+    def _wake_oled(self, now: Optional[int] = None):
         """Wake the OLED and force a redraw."""
         self._oled_sleeping = False
-        self._last_activity = time.perf_counter()
+        self._last_activity = _monotonic_ns() if now is None else now
         self._force_draw_next = True
         print("[UI] OLED waking up")
 
     # --- drawing ---
-    def _draw(self, code: str, secs_left: int):
-        if not self.oled:
+    def _draw(self, code: str, secs_left: int, now: Optional[int] = None):
+        if not self.oled or _canvas is None:
             return
         if self._oled_sleeping:
             return
 
-        now = time.time()
+        if now is None:
+            now = _monotonic_ns()
 
         # Force draw on screen changes or live screens
         should_draw = (self._force_draw_next or
                       self.screen == 0 or  # Always update info screen
                       self.screen == 1 or  # Always update settings screen (live edits)
                       self.screen == 3 or  # Always update debug screen (live UTC)
-                      now - self._last_draw_ts > 0.05)  # 50ms max for other screens
+                      now - self._last_draw_ts > DRAW_INTERVAL_NS)  # 50ms max for other screens
 
         if not should_draw:
             return
 
+        # Skip the canvas flush (a full framebuffer push over I2C) when nothing visible changed;
+        # the debug screen's UTC clock makes its content change once per second
+        key = (self.screen, code, secs_left, int(self.hue*360), self.user_pct,
+               self._wifi_connected, self._wifi_ssid, self._wifi_ip, self._offline,
+               self._lang_idx, self.selection, self.confirm_for,
+               self._settings_sel, self._settings_editing,
+               int(time.time()) if self.screen == 3 else 0)
+        if key == self._last_draw_key and not self._force_draw_next:
+            return
+        self._last_draw_key = key
+
         self._last_draw_ts = now
+        if self._force_draw_next:
+            # forced draws (wake, screen change, after others drew on the panel) resend it all
+            self._flusher.invalidate()
         self._force_draw_next = False
 
         try:
-            from luma.core.render import canvas
-
-            with canvas(self.oled) as draw:
+            labels = self._screen_strings[self.screen]
+            with _partial_canvas(self._flusher) as draw:
                 if self.screen == 0:
                     # Info screen - show current status
-                    draw.text((0, 0),  f"{t('otp')}  : {code}", fill=1)
-                    draw.text((0, 14), f"{t('time')} : {secs_left:2d}s", fill=1)
-                    draw.text((0, 25), f"{t('hue')}  : {int(self.hue*360):3d}\xb0", fill=1)
-                    draw.text((0, 37), f"{t('bright')}: {self.user_pct:3d}%", fill=1)
-                    draw.text((0, 52), t("press_next"), fill=1)
+                    f_otp, f_time, f_hue, f_bright, l_next = labels
+                    draw.text((0, 0),  f_otp % code, fill=1)
+                    draw.text((0, 14), f_time % secs_left, fill=1)
+                    draw.text((0, 25), f_hue % int(self.hue*360), fill=1)
+                    draw.text((0, 37), f_bright % self.user_pct, fill=1)
+                    draw.text((0, 52), l_next, fill=1)
 
                 elif self.screen == 1:
                     # Settings screen: Next + Color + Brightness
                     draw.text((0, 0), "-- Settings --", fill=1)
 
+                    l_next, l_hue, l_bright = labels
                     items = [
-                        (t("next_screen"), self._settings_sel == 0),
-                        (f"{t('hue')}: {int(self.hue*360):3d}\xb0", self._settings_sel == 1),
-                        (f"{t('bright')}: {self.user_pct:3d}%", self._settings_sel == 2),
+                        (l_next, self._settings_sel == 0),
+                        (f"{l_hue}: {int(self.hue*360):3d}\xb0", self._settings_sel == 1),
+                        (f"{l_bright}: {self.user_pct:3d}%", self._settings_sel == 2),
                     ]
 
                     y = 16
@@ -503,11 +708,12 @@ class OledUI:
                     # Language picker
                     code = self._lang_codes[self._lang_idx]
                     _, native, english = lang.LANGUAGES[self._lang_idx]
-                    draw.text((0, 0), t("lang_title"), fill=1)
+                    l_title, l_rotate, l_next = labels
+                    draw.text((0, 0), l_title, fill=1)
                     draw.text((0, 14), f"> {native}", fill=1)
                     draw.text((0, 28), f"  ({english})", fill=1)
-                    draw.text((0, 42), t("rotate_lang"), fill=1)
-                    draw.text((0, 54), t("press_next"), fill=1)
+                    draw.text((0, 42), l_rotate, fill=1)
+                    draw.text((0, 54), l_next, fill=1)
 
                 elif self.screen == 3:
                     # Debug screen - device info
@@ -535,32 +741,22 @@ class OledUI:
                     draw.text((0, 50), self._version if self._version else "v?.?.?", fill=1)
 
                 elif self.screen == 4:
-                    wifi_label = "Turn WiFi On" if self._offline else "Turn WiFi Off"
-                    if self._offline:
-                        opts = [t("next_screen"), wifi_label, "Sync Time", t("reset_wifi"), t("reset_qr"), t("reset_both")]
-                    else:
-                        opts = [t("next_screen"), wifi_label, t("reset_wifi"), t("reset_qr"), t("reset_both")]
+                    opts = labels[0] if self._offline else labels[1]
                     draw.text((0, 0), "-- Options --", fill=1)
                     y = 12
                     for i, s in enumerate(opts):
                         prefix = ">" if i == self.selection else " "
-                        text = f"{prefix} {s}"
-                        if len(text) > 20:
-                            text = text[:19] + "..."
-                        draw.text((0, y), text, fill=1)
+                        draw.text((0, y), f"{prefix} {s}", fill=1)
                         y += 9
 
                 elif self.screen == 5:
-                    label = {
-                        ResetAction.WIFI: t("confirm_wifi"),
-                        ResetAction.QR:   t("confirm_qr"),
-                        ResetAction.BOTH: t("confirm_both"),
-                    }.get(self.confirm_for, "Reset?")
-                    draw.text((0, 0), t("confirm_title"), fill=1)
+                    l_title, l_yes, l_cancel, l_restarts, l_confirm = labels
+                    label = l_confirm.get(self.confirm_for, "Reset?")
+                    draw.text((0, 0), l_title, fill=1)
                     draw.text((0, 14), label, fill=1)
-                    draw.text((0, 28), t("press_yes"), fill=1)
-                    draw.text((0, 40), t("rotate_cancel"), fill=1)
-                    draw.text((0, 52), t("restarts_after"), fill=1)
+                    draw.text((0, 28), l_yes, fill=1)
+                    draw.text((0, 40), l_cancel, fill=1)
+                    draw.text((0, 52), l_restarts, fill=1)
 
         except Exception as e:
             print(f"[UI] Draw error: {e}")
@@ -581,23 +777,10 @@ def perform_reset(which: str, oled=None, led_strip=None):
         except Exception as e:
             print(f"[RESET] LED strip clear failed: {e}")
 
-    # Show reset message on OLED
-    if oled:
-        try:
-            from luma.core.render import canvas
-            with canvas(oled) as draw:
-                draw.text((0, 0), t("resetting"), fill=1)
-                draw.text((0, 16), f"{t('action')}: {which}", fill=1)
-                draw.text((0, 32), t("system_reboot"), fill=1)
-                draw.text((0, 48), t("please_wait"), fill=1)
-            time.sleep(2.0)  # Give user time to read
-        except Exception as e:
-            print(f"[RESET] OLED message failed: {e}")
-
-    # Perform the actual reset operations (delete files)
-    try:
-        files_deleted = []
+    files_deleted = []
 
+    def _do_deletions():
+        """Delete the reset targets (runs while the OLED message is on screen)."""
         if which in (ResetAction.WIFI, ResetAction.BOTH):
             try:
                 if WIFI_CONFIG.exists():
@@ -609,7 +792,7 @@ def perform_reset(which: str, oled=None, led_strip=None):
 
             # Also clear NetworkManager saved connections
             try:
-                import subprocess, glob
+                import glob
                 nm_conns = glob.glob("/etc/NetworkManager/system-connections/*")
                 for f in nm_conns:
                     subprocess.run(["sudo", "rm", "-f", f], capture_output=True)
@@ -634,13 +817,36 @@ def perform_reset(which: str, oled=None, led_strip=None):
             except Exception as e:
                 print(f"[RESET] Failed to delete QR/secret files: {e}")
 
+    # Perform the actual reset operations (delete files) while the message is shown;
+    # the unlinks (and their SD card writes) overlap the 2s reading pause
+    import threading
+    deleter = threading.Thread(target=_do_deletions, name="reset-delete", daemon=True)
+    deleter.start()
+
+    # Show reset message on OLED
+    if oled and _canvas is not None:
+        try:
+            with _canvas(oled) as draw:
+                draw.text((0, 0), t("resetting"), fill=1)
+                draw.text((0, 16), f"{t('action')}: {which}", fill=1)
+                draw.text((0, 32), t("system_reboot"), fill=1)
+                draw.text((0, 48), t("please_wait"), fill=1)
+            time.sleep(2.0)  # Give user time to read
+        except Exception as e:
+            print(f"[RESET] OLED message failed: {e}")
+
+    try:
+        # Deletions must be finished before "files deleted" is shown and before sync/reboot
+        deleter.join(timeout=15.0)
+        if deleter.is_alive():
+            print("[RESET] File deletion still running; continuing to reboot")
+
         print(f"[RESET] Files deleted: {files_deleted}")
 
         # Final OLED message before reboot
-        if oled:
+        if oled and _canvas is not None:
             try:
-                from luma.core.render import canvas
-                with canvas(oled) as draw:
+                with _canvas(oled) as draw:
                     draw.text((0, 0), t("files_deleted"), fill=1)
                     draw.text((0, 16), t("rebooting"), fill=1)
                     draw.text((0, 32), t("wait_reboot"), fill=1)
@@ -662,24 +868,26 @@ def perform_reset(which: str, oled=None, led_strip=None):
         except Exception:
             pass
 
+    # Sync filesystems first (syscall; no need to fork a `sync` process)
     try:
-        # Sync filesystems first
-        subprocess.run(["sync"], timeout=5)
+        os.sync()
+    except Exception:
+        pass
 
+    try:
         # Clean system reboot
         subprocess.run(["sudo", "reboot"], timeout=5)
 
     except Exception as e:
         print(f"[RESET] Reboot command failed: {e}")
-        # Fallback: force reboot
+        # Fallback: `sudo reboot -f` would most likely fail the same way, go straight to sysrq
         try:
-            subprocess.run(["sudo", "reboot", "-f"], timeout=5)
-        except Exception:
-            # Last resort: immediate reboot
             with open("/proc/sys/kernel/sysrq", "w") as f:
                 f.write("1")
             with open("/proc/sysrq-trigger", "w") as f:
                 f.write("b")  # Immediate reboot
+        except Exception as e2:
+            print(f"[RESET] sysrq reboot failed: {e2}")
 
     # This should never be reached due to reboot
     time.sleep(10)
@@ -10,6 +10,7 @@ Usage:
     python3 ota_update.py              # check + update if newer
     python3 ota_update.py --check      # just check, don't apply
     python3 ota_update.py --force      # update even if same version
+    python3 ota_update.py --reinstall  # --force, re-extracting even an already-installed bundle
     python3 ota_update.py --rollback   # revert to previous backup
 
 Configuration:
@@ -21,7 +22,8 @@ Remote layout expected (GitHub release or any HTTP server):
 """
 
 from __future__ import annotations
-import os, sys, json, shutil, tarfile, hashlib, subprocess, time
+import os, sys, json, shutil, tarfile, hashlib, subprocess, time, threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from typing import Optional
@@ -31,6 +33,9 @@ VERSION_FILE = PROJECT_DIR / "version.txt"
 BACKUP_DIR   = PROJECT_DIR / "backups"
 OTA_LOG_FILE = PROJECT_DIR / "ota_update.log"
 CONFIG_FILE  = PROJECT_DIR / "ota_config.json"
+ETAG_FILE    = PROJECT_DIR / ".ota_etag.json"   # validators of the last version.txt fetch
+STATE_FILE   = PROJECT_DIR / "ota_state.json"   # installed_bundle_sha of the applied bundle
+STAGING_DIR  = PROJECT_DIR / ".ota_staging"     # streamed files wait here until verified
 
 # ── Default configuration ──────────────────────────────────────────
 # Override by creating ota_config.json next to this script.
@@ -39,6 +44,10 @@ OTA_CONFIG = {
     "version_url": "https://github.com/mylesdedwards/OTPi/releases/latest/download/version.txt",
     "bundle_url":  "https://github.com/mylesdedwards/OTPi/releases/latest/download/otpi_update.tar.gz",
 
+    # SHA-256 of the bundle ("sha256sum" output); empty = bundle_url + ".sha256".
+    # Releases without one are applied unverified.
+    "sha256_url": "",
+
     # Service name to restart after update (set to "" to skip restart)
     "service_name": "otpi.service",
 
@@ -60,15 +69,26 @@ OTA_CONFIG = {
 }
 
 
+_LOG_LOCK = threading.Lock()  # extraction workers log too; keep lines whole
+_LOG_FH = None                # ota_update.log, opened once and kept open (line-buffered)
+_LOG_TS = (0, "")             # (epoch second, formatted timestamp) of the last line
+
+
 def _log(msg: str):
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    line = f"[{ts}] {msg}"
-    print(line)
-    try:
-        with open(OTA_LOG_FILE, "a") as f:
-            f.write(line + "\n")
-    except Exception:
-        pass
+    global _LOG_FH, _LOG_TS
+    with _LOG_LOCK:
+        # One strftime per second at most; updates log bursts of lines within a second
+        sec = int(time.time())
+        if sec != _LOG_TS[0]:
+            _LOG_TS = (sec, datetime.fromtimestamp(sec).strftime("%Y-%m-%d %H:%M:%S"))
+        line = f"[{_LOG_TS[1]}] {msg}"
+        print(line)
+        try:
+            if _LOG_FH is None:
+                _LOG_FH = open(OTA_LOG_FILE, "a", buffering=1)
+            _LOG_FH.write(line + "\n")
+        except Exception:
+            pass
 
 
 def _load_config() -> dict:
@@ -82,6 +102,12 @@ def _load_config() -> dict:
             _log(f"Loaded config from {CONFIG_FILE}")
     except Exception as e:
         _log(f"Config load error: {e}, using defaults")
+    # Built once here: extraction does one frozenset lookup per member (normalized like the names)
+    try:
+        config["protected_files"] = frozenset(os.path.normpath(p) for p in config.get("protected_files", ()))
+    except Exception as e:
+        _log(f"Bad protected_files ({e}), using defaults")
+        config["protected_files"] = frozenset(OTA_CONFIG["protected_files"])
     return config
 
 
@@ -140,20 +166,79 @@ def _get_local_version() -> str:
 
 
 def _set_local_version(version: str):
-    """Write local version string."""
-    VERSION_FILE.write_text(version.strip() + "\n", encoding="utf-8")
+    """Write local version string (temp file + rename: never left empty by a power cut)."""
+    tmp = VERSION_FILE.with_name(VERSION_FILE.name + ".tmp")
+    tmp.write_text(version.strip() + "\n", encoding="utf-8")
+    os.replace(tmp, VERSION_FILE)
+
+
+# Kept-alive HTTP(S) connections by (scheme, host): the version check, checksum and bundle
+# downloads reuse them instead of paying a new TCP + TLS handshake for every request
+_CONNS: dict = {}
+_REDIRECTS = (301, 302, 303, 307, 308)
+
+
+def _open_url(url: str, timeout: int = 30, headers: Optional[dict] = None):
+    """
+    GET `url` over a pooled connection, following redirects.
+    Returns the http.client response (status 200 or 304); the caller must read it to the end.
+    """
+    import http.client
+    from urllib.parse import urlsplit, urljoin
+
+    hdrs = {"User-Agent": "OTPi-Updater/1.0"}
+    if headers:
+        hdrs.update(headers)
+
+    for _ in range(10):
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+        conn = _CONNS.get(key)
+        for attempt in range(2):
+            if conn is None:
+                cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+                conn = _CONNS[key] = cls(parts.netloc, timeout=timeout)
+            else:
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+            try:
+                conn.request("GET", path, headers=hdrs)
+                resp = conn.getresponse()
+                break
+            except (http.client.HTTPException, OSError):
+                # server may have dropped an idle keep-alive connection: reconnect once
+                conn.close()
+                _CONNS.pop(key, None)
+                conn = None
+                if attempt:
+                    raise
+
+        if resp.status in _REDIRECTS:
+            location = resp.getheader("Location")
+            resp.read()  # drain so the connection can carry the next request
+            if not location:
+                raise OSError(f"HTTP {resp.status} without Location for {url}")
+            url = urljoin(url, location)
+            continue
+        if resp.status in (200, 304):
+            return resp
+        resp.read()
+        raise OSError(f"HTTP {resp.status} {resp.reason} for {url}")
+
+    raise OSError(f"Too many redirects for {url}")
 
 
 def _fetch_url(url: str, timeout: int = 30) -> Optional[bytes]:
-    """Download URL contents. Tries urllib (stdlib), falls back to curl."""
-    # Method 1: urllib (no external deps)
+    """Download small URL contents (version.txt) into memory. Tries http.client (stdlib), falls back to curl."""
+    # Method 1: stdlib http.client over a pooled connection (no external deps)
     try:
-        from urllib.request import urlopen, Request
-        req = Request(url, headers={"User-Agent": "OTPi-Updater/1.0"})
-        with urlopen(req, timeout=timeout) as resp:
+        with _open_url(url, timeout=timeout) as resp:
             return resp.read()
     except Exception as e:
-        _log(f"urllib fetch failed: {e}")
+        _log(f"HTTP fetch failed: {e}")
 
     # Method 2: curl fallback
     try:
@@ -170,29 +255,149 @@ def _fetch_url(url: str, timeout: int = 30) -> Optional[bytes]:
     return None
 
 
+def _fetch_url_to_file(url: str, dest: Path, timeout: int = 30) -> bool:
+    """
+    Download URL straight into `dest` without holding the body in memory.
+    Tries http.client (stdlib), falls back to curl writing the file itself.
+    """
+    # Method 1: pooled http.client connection, copied to disk in 64 KiB chunks
+    try:
+        with _open_url(url, timeout=timeout) as resp, open(dest, "wb") as out:
+            shutil.copyfileobj(resp, out, 64 * 1024)
+        return True
+    except Exception as e:
+        _log(f"HTTP fetch failed: {e}")
+
+    # Method 2: curl fallback (-o: curl writes the file, nothing passes through Python)
+    try:
+        result = subprocess.run(
+            ["curl", "-fsSL", "--max-time", str(timeout), "-o", str(dest), url],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=timeout + 5,
+        )
+        if result.returncode == 0:
+            return True
+        _log(f"curl failed: {result.stderr.decode(errors='replace').strip()}")
+    except Exception as e:
+        _log(f"curl error: {e}")
+
+    return False
+
+
 def _get_remote_version(config: dict) -> Optional[str]:
-    """Fetch remote version string."""
-    data = _fetch_url(config["version_url"])
+    """
+    Fetch remote version string. The request is conditional on the ETag/Last-Modified of
+    the previous fetch, so an unchanged version.txt comes back as a body-less 304.
+    """
+    url = config["version_url"]
+    cache = {}
+    try:
+        cache = json.loads(ETAG_FILE.read_bytes())
+        if cache.get("url") != url or not cache.get("version"):
+            cache = {}
+    except Exception:
+        pass
+
+    headers = {}
+    if cache.get("etag"):
+        headers["If-None-Match"] = cache["etag"]
+    if cache.get("last_modified"):
+        headers["If-Modified-Since"] = cache["last_modified"]
+
+    data = None
+    try:
+        with _open_url(url, headers=headers) as resp:
+            data = resp.read()
+            if resp.status == 304:
+                _log("version.txt unchanged (304)")
+                return cache["version"]
+            etag = resp.getheader("ETag")
+            last_modified = resp.getheader("Last-Modified")
+    except Exception as e:
+        _log(f"HTTP fetch failed: {e}")
+        data = _fetch_url(url)  # curl fallback (unconditional)
+        etag = last_modified = None
+
     if data:
         ver = data.decode("utf-8", errors="replace").strip().splitlines()[0].strip()
+        if etag or last_modified:
+            try:
+                tmp = ETAG_FILE.with_name(ETAG_FILE.name + ".tmp")
+                tmp.write_text(json.dumps({"url": url, "etag": etag,
+                                           "last_modified": last_modified, "version": ver}))
+                os.replace(tmp, ETAG_FILE)
+            except Exception:
+                pass
         return ver
     return None
 
 
+def _get_expected_sha256(config: dict) -> Optional[str]:
+    """Fetch the published SHA-256 of the bundle, or None if the release has none."""
+    url = config.get("sha256_url") or (config["bundle_url"] + ".sha256")
+    data = _fetch_url(url)
+    if data:
+        fields = data.decode("ascii", errors="replace").split()
+        digest = fields[0].lower() if fields else ""
+        if len(digest) == 64 and all(c in "0123456789abcdef" for c in digest):
+            return digest
+        _log(f"Ignoring malformed checksum from {url}")
+    _log("No bundle checksum published; update will not be verified")
+    return None
+
+
+def _file_sha256(path: Path) -> str:
+    """SHA-256 of a file in one pass (hashlib.file_digest on 3.11+, chunked read otherwise)."""
+    with open(path, "rb") as f:
+        if hasattr(hashlib, "file_digest"):
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        h = hashlib.sha256()
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            h.update(chunk)
+        return h.hexdigest()
+
+
+class _HashingReader:
+    """File-like wrapper that feeds everything read through it into a hash."""
+    def __init__(self, raw, h):
+        self.raw = raw
+        self.h = h
+
+    def read(self, n: int = -1) -> bytes:
+        data = self.raw.read(n)
+        self.h.update(data)
+        return data
+
+
 def _download_bundle(config: dict) -> Optional[Path]:
     """Download the update bundle to a temp file."""
     _log(f"Downloading update bundle from {config['bundle_url']}")
-    data = _fetch_url(config["bundle_url"], timeout=120)
-    if not data:
+    tmp = PROJECT_DIR / ".ota_update.tar.gz"
+    part = tmp.with_name(tmp.name + ".part")  # only renamed to `tmp` once complete
+    if not _fetch_url_to_file(config["bundle_url"], part, timeout=120):
         _log("Bundle download failed")
+        try:
+            part.unlink()
+        except FileNotFoundError:
+            pass
         return None
 
-    tmp = PROJECT_DIR / ".ota_update.tar.gz"
-    tmp.write_bytes(data)
-    _log(f"Downloaded {len(data)} bytes -> {tmp}")
+    os.replace(part, tmp)
+    _log(f"Downloaded {tmp.stat().st_size} bytes -> {tmp}")
     return tmp
 
 
+def _copy_files(files, dest_dir: Path) -> int:
+    """
+    copy2 each file into dest_dir on a few threads (the copies are independent and
+    SD-card bound; copy2 itself uses the kernel's sendfile path on Linux). Returns the count.
+    """
+    files = list(files)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        for _ in pool.map(lambda f: shutil.copy2(f, dest_dir / f.name), files):
+            pass
+    return len(files)
+
+
 def _create_backup(config: dict) -> Optional[Path]:
     """Backup current .py files to a timestamped directory."""
     BACKUP_DIR.mkdir(parents=True, exist_ok=True)
@@ -202,10 +407,7 @@ def _create_backup(config: dict) -> Optional[Path]:
     backup_path = BACKUP_DIR / f"v{local_ver}_{ts}"
     backup_path.mkdir(parents=True, exist_ok=True)
 
-    count = 0
-    for f in PROJECT_DIR.glob("*.py"):
-        shutil.copy2(f, backup_path / f.name)
-        count += 1
+    count = _copy_files(PROJECT_DIR.glob("*.py"), backup_path)
 
     # Also backup version.txt
     if VERSION_FILE.exists():
@@ -219,58 +421,195 @@ def _create_backup(config: dict) -> Optional[Path]:
     return backup_path
 
 
-def _prune_backups(max_keep: int):
-    """Remove oldest backups beyond max_keep."""
-    if not BACKUP_DIR.exists():
-        return
-    backups = sorted(BACKUP_DIR.iterdir(), key=lambda p: p.name)
-    while len(backups) > max_keep:
-        old = backups.pop(0)
-        if old.is_dir():
-            shutil.rmtree(old, ignore_errors=True)
-            _log(f"Pruned old backup: {old.name}")
-
+def _list_backups() -> list:
+    """Backup directories, oldest first (by mtime: the name starts with the version, not the date)."""
+    try:
+        with os.scandir(BACKUP_DIR) as it:
+            entries = [e for e in it if e.is_dir(follow_symlinks=False)]
+    except FileNotFoundError:
+        return []
+    # DirEntry caches its stat, so the sort costs one syscall per entry
+    entries.sort(key=lambda e: (e.stat(follow_symlinks=False).st_mtime, e.name))
+    return entries
 
-def _apply_update(bundle_path: Path, config: dict) -> bool:
-    """Extract the update bundle, skipping protected files."""
-    protected = set(config.get("protected_files", []))
 
+def _prune_backups(max_keep: int):
+    """Remove oldest backups beyond max_keep."""
+    backups = _list_backups()
+    for old in backups[:max(0, len(backups) - max_keep)]:
+        shutil.rmtree(old.path, ignore_errors=True)
+        _log(f"Pruned old backup: {old.name}")
+
+
+def _write_member(target: Path, data: bytes, name: str):
+    target.write_bytes(data)
+    _log(f"  Updated: {name}")
+
+
+# tarfile's "data" extraction filter (Python 3.12, backported to 3.11.4+); None on older
+# interpreters such as Bookworm's 3.11.2, which use the hand-written loop instead
+_DATA_FILTER = getattr(tarfile, "data_filter", None)
+
+
+def _extract_all(tar: tarfile.TarFile, protected: frozenset, dest: Path) -> int:
+    """Let tarfile.extractall() write the bundle, with one filter callback per member."""
+    applied = 0
+
+    def _filter(member: tarfile.TarInfo, dest: str):
+        nonlocal applied
+        try:
+            # rejects "..", links leaving `dest` and device files; strips a leading "/"
+            member = _DATA_FILTER(member, dest)
+        except tarfile.FilterError:
+            _log(f"  SKIP (unsafe path): {member.name}")
+            return None
+        # checked on the filtered, normalized name so "/wifi_config.txt" or
+        # "./wifi_config.txt" can't slip past
+        if os.path.normpath(member.name) in protected:
+            _log(f"  SKIP (protected): {member.name}")
+            return None
+        if member.isreg():
+            applied += 1
+            _log(f"  Updated: {member.name}")
+        return member
+
+    tar.extractall(dest, filter=_filter)
+    return applied
+
+
+def _extract_members(tar: tarfile.TarFile, config: dict, dest: Path = PROJECT_DIR) -> int:
+    """Write every allowed member of `tar` into `dest`, in archive order. Returns the file count."""
+    protected = config.get("protected_files", frozenset())
+    if _DATA_FILTER is not None:
+        return _extract_all(tar, protected, dest)
+
+    applied = 0
+
+    # Bigger bundles overlap the SD card writes on a few threads (started once a 9th
+    # file shows up); tarfile itself is not thread-safe, so member bodies are still
+    # read here on the main thread
+    pool = None
+    futures = []
     try:
+        # Single forward pass over the archive: no getmembers() index walk, and no
+        # backward seeks, so it works on a non-seekable "r|gz" stream as well
+        for member in tar:
+            # Security: skip absolute paths or path traversal
+            if member.name.startswith("/") or ".." in member.name:
+                _log(f"  SKIP (unsafe path): {member.name}")
+                continue
+
+            # Skip directories
+            if member.isdir():
+                continue
+
+            # Skip protected files
+            if os.path.normpath(member.name) in protected:
+                _log(f"  SKIP (protected): {member.name}")
+                continue
+
+            # Extract to project dir (or the staging dir)
+            target = dest / member.name
+            target.parent.mkdir(parents=True, exist_ok=True)
+
+            with tar.extractfile(member) as src:
+                if src:
+                    data = src.read()
+                    if pool is None and applied >= 8:
+                        pool = ThreadPoolExecutor(max_workers=4)
+                    if pool is None:
+                        _write_member(target, data, member.name)
+                    else:
+                        futures.append(pool.submit(_write_member, target, data, member.name))
+                    applied += 1
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    # Surface the first failed write (if any) as an extraction failure
+    for fut in futures:
+        fut.result()
+    return applied
+
+
+def _promote_staged(staging: Path) -> int:
+    """Move every file under `staging` to the same relative path in PROJECT_DIR. Returns the count."""
+    moved = 0
+    for root, dirs, files in os.walk(staging):
+        rel = Path(root).relative_to(staging)
+        # os.walk lists symlinks to directories under `dirs`; move those like files
+        for name in files + [d for d in dirs if os.path.islink(os.path.join(root, d))]:
+            target = PROJECT_DIR / rel / name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(os.path.join(root, name), target)
+            moved += 1
+    return moved
+
+
+def _apply_update(bundle_path: Path, config: dict, expected_sha: Optional[str] = None) -> bool:
+    """
+    Verify and extract the downloaded update bundle, skipping protected files. Like the
+    streaming path it extracts into STAGING_DIR first, so a bundle that breaks off half-way
+    leaves nothing behind in PROJECT_DIR.
+    """
+    shutil.rmtree(STAGING_DIR, ignore_errors=True)
+    try:
+        if expected_sha:
+            actual = _file_sha256(bundle_path)
+            if actual != expected_sha:
+                _log(f"Bundle checksum mismatch: expected {expected_sha}, got {actual}")
+                return False
+            _log("Bundle checksum OK")
+
+        STAGING_DIR.mkdir(parents=True)
         with tarfile.open(bundle_path, "r:gz") as tar:
-            members = tar.getmembers()
-            applied = 0
-
-            for member in members:
-                # Security: skip absolute paths or path traversal
-                if member.name.startswith("/") or ".." in member.name:
-                    _log(f"  SKIP (unsafe path): {member.name}")
-                    continue
-
-                # Skip directories
-                if member.isdir():
-                    continue
-
-                # Skip protected files
-                if member.name in protected:
-                    _log(f"  SKIP (protected): {member.name}")
-                    continue
-
-                # Extract to project dir
-                target = PROJECT_DIR / member.name
-                target.parent.mkdir(parents=True, exist_ok=True)
-
-                with tar.extractfile(member) as src:
-                    if src:
-                        target.write_bytes(src.read())
-                        applied += 1
-                        _log(f"  Updated: {member.name}")
+            _extract_members(tar, config, STAGING_DIR)
 
+        applied = _promote_staged(STAGING_DIR)
         _log(f"Applied {applied} files from update bundle")
         return True
 
     except Exception as e:
         _log(f"Update extraction failed: {e}")
         return False
+    finally:
+        shutil.rmtree(STAGING_DIR, ignore_errors=True)
+
+
+def _apply_update_stream(config: dict, expected_sha: Optional[str] = None) -> bool:
+    """
+    Download and extract the bundle in one go: the HTTP response is gunzipped and untarred
+    as it arrives ("r|gz" stream mode), so network, decompression and file writes overlap
+    and no temp copy of the bundle is written. Files land in STAGING_DIR and only move
+    into PROJECT_DIR once the whole stream is in and its SHA-256 matches `expected_sha`.
+    """
+    _log(f"Streaming update bundle from {config['bundle_url']}")
+    shutil.rmtree(STAGING_DIR, ignore_errors=True)
+    try:
+        STAGING_DIR.mkdir(parents=True)
+        with _open_url(config["bundle_url"], timeout=120) as resp:
+            h = hashlib.sha256()
+            reader = _HashingReader(resp, h)
+            # 64 KiB reads from the socket/gunzip instead of tarfile's default 10 KiB records
+            with tarfile.open(fileobj=reader, mode="r|gz", bufsize=64 * 1024) as tar:
+                _extract_members(tar, config, STAGING_DIR)
+            reader.read()  # rest of the stream (tar end padding): hashed, and frees the connection
+
+        if expected_sha:
+            if h.hexdigest() != expected_sha:
+                _log(f"Bundle checksum mismatch: expected {expected_sha}, got {h.hexdigest()}")
+                return False
+            _log("Bundle checksum OK")
+
+        applied = _promote_staged(STAGING_DIR)
+        _log(f"Applied {applied} files from update bundle")
+        return True
+
+    except Exception as e:
+        _log(f"Streaming update failed: {e}")
+        return False
+    finally:
+        shutil.rmtree(STAGING_DIR, ignore_errors=True)
 
 
 def _restart_service(config: dict):
@@ -282,41 +621,59 @@ def _restart_service(config: dict):
 
     _log(f"Restarting {svc}...")
     try:
+        # --no-block: only enqueue the restart job. Waiting for it could get this process
+        # killed mid-wait when it runs inside the service being restarted.
         result = subprocess.run(
-            ["systemctl", "restart", svc],
-            capture_output=True, text=True, timeout=30,
+            ["systemctl", "--no-block", "restart", svc],
+            capture_output=True, text=True, timeout=10,
         )
         if result.returncode == 0:
-            _log(f"{svc} restarted successfully")
+            _log(f"{svc} restart queued")
         else:
             _log(f"Restart failed: {result.stderr.strip()}")
     except Exception as e:
         _log(f"Restart error: {e}")
 
 
+def _load_state() -> dict:
+    try:
+        return json.loads(STATE_FILE.read_bytes())
+    except Exception:
+        return {}
+
+
+def _save_state(state: dict):
+    try:
+        tmp = STATE_FILE.with_name(STATE_FILE.name + ".tmp")
+        tmp.write_text(json.dumps(state, indent=2) + "\n", encoding="utf-8")
+        os.replace(tmp, STATE_FILE)
+    except Exception as e:
+        _log(f"State save error: {e}")
+
+
 def rollback() -> bool:
     """Roll back to the most recent backup."""
     if not BACKUP_DIR.exists():
         _log("No backups directory found")
         return False
 
-    backups = sorted(BACKUP_DIR.iterdir(), key=lambda p: p.name)
+    backups = _list_backups()
     if not backups:
         _log("No backups available")
         return False
 
-    latest = backups[-1]
+    latest = Path(backups[-1].path)
     _log(f"Rolling back to: {latest.name}")
 
-    count = 0
-    for f in latest.glob("*.py"):
-        shutil.copy2(f, PROJECT_DIR / f.name)
-        count += 1
+    count = _copy_files(latest.glob("*.py"), PROJECT_DIR)
 
     ver_file = latest / "version.txt"
     if ver_file.exists():
         shutil.copy2(ver_file, VERSION_FILE)
 
+    # The files on disk no longer match the last applied bundle
+    _save_state({"installed_bundle_sha": None})
+
     _log(f"Rolled back {count} files from {latest.name}")
     return True
 
@@ -342,7 +699,44 @@ def check_for_update(config: dict = None) -> dict:
     return {"available": available, "local": local_ver, "remote": remote_ver}
 
 
-def do_update(force: bool = False) -> bool:
+def _install_bundle(config: dict, expected_sha: Optional[str]) -> bool:
+    """Back up, then download and extract the bundle; rolls back and returns False on failure."""
+    # Backup current installation
+    backup_path = _create_backup(config)
+    if not backup_path:
+        _log("Backup failed, aborting update")
+        return False
+
+    # Download + apply straight from the HTTP stream; if that fails (no direct HTTP,
+    # connection dropped mid-way, checksum mismatch) fetch the whole bundle to disk
+    # (curl fallback) and verify it before applying. Both paths extract into STAGING_DIR
+    # and only move files into PROJECT_DIR once the whole bundle is in, so a failure on
+    # either leaves the project as the backup has it
+    if not _apply_update_stream(config, expected_sha):
+        bundle = _download_bundle(config)
+        if not bundle:
+            _log("Download failed, rolling back...")
+            rollback()
+            return False
+
+        # Apply update
+        applied = _apply_update(bundle, config, expected_sha)
+
+        # Clean up temp file
+        try:
+            bundle.unlink()
+        except Exception:
+            pass
+
+        if not applied:
+            _log("Apply failed, rolling back...")
+            rollback()
+            return False
+
+    return True
+
+
+def do_update(force: bool = False, force_extract: bool = False) -> bool:
     """
     Full update flow: migrate config -> check -> backup -> download -> apply -> restart.
     Returns True if update was applied successfully.
@@ -368,34 +762,22 @@ def do_update(force: bool = False) -> bool:
     remote_ver = status["remote"]
     _log(f"Starting update to v{remote_ver}...")
 
-    # Backup current installation
-    backup_path = _create_backup(config)
-    if not backup_path:
-        _log("Backup failed, aborting update")
-        return False
+    expected_sha = _get_expected_sha256(config)
 
-    # Download bundle
-    bundle = _download_bundle(config)
-    if not bundle:
-        _log("Download failed, aborting update")
-        return False
-
-    # Apply update
-    if not _apply_update(bundle, config):
-        _log("Apply failed, rolling back...")
-        rollback()
+    if (expected_sha and not force_extract
+            and expected_sha == _load_state().get("installed_bundle_sha")):
+        # Exactly this bundle is already extracted (e.g. --force with no upstream change):
+        # no backup, download or file writes
+        _log("Bundle already installed (checksum match), skipping download and extraction")
+    elif not _install_bundle(config, expected_sha):
         return False
+    else:
+        _save_state({"installed_bundle_sha": expected_sha})
 
     # Update local version
     _set_local_version(remote_ver)
     _log(f"Version updated to {remote_ver}")
 
-    # Clean up temp file
-    try:
-        bundle.unlink()
-    except Exception:
-        pass
-
     # Restart service
     _restart_service(config)
 
@@ -430,6 +812,7 @@ if __name__ == "__main__":
         print(f"Update: {'available' if status['available'] else 'up to date'}")
         sys.exit(0)
 
-    force = "--force" in args
-    success = do_update(force=force)
+    reinstall = "--reinstall" in args
+    force = "--force" in args or reinstall
+    success = do_update(force=force, force_extract=reinstall)
     sys.exit(0 if success else 1)